@@ -0,0 +1,131 @@
+# applog.py
+"""アプリケーションのログ設定
+
+ロガーは "shift" 以下の名前（shift.api, shift.time など）を使います。
+ログは呼び出し元ではキューに積むだけで、整形と出力は専用スレッドで行います。
+メッセージへの引数の埋め込みと例外の整形はキューに積む前に行うため、引数に変更可能なオブジェクト
+（ORMの行・dict・list など）を渡しても、ログを呼び出した時点の内容で出力されます。
+出力レベルは環境変数で初期設定でき、実行中も set_level で変更できます。
+
+    LOG_LEVEL=INFO                          "shift" 全体のレベル
+    LOG_LEVELS=shift.time=DEBUG,shift.api=DEBUG   ロガーごとのレベル
+    LOG_FORMAT=json                         json（1行1件）または text
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT_LOGGER_NAME = "shift"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# 出力が追いつかない場合にキューに溜める最大件数（超えた分は捨てる）
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# LogRecordの標準属性（これ以外は extra で渡された項目としてJSONに含める）
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+class JsonFormatter(logging.Formatter):
+    """1件を1行のJSONに整形する"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+_exception_formatter = logging.Formatter()
+
+class NonBlockingQueueHandler(QueueHandler):
+    """キューに積むだけのハンドラ。キューが満杯なら待たずに捨てる"""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 引数は後から変更される可能性があるため、呼び出し時点で埋め込む。
+        # 例外も文字列にして、引数やトレースバックのオブジェクトをキューに残さない（日時などの整形は出力スレッドで行う）
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+_listener = None
+
+def parse_level(level: str) -> int:
+    value = logging.getLevelName(level.upper())
+    if not isinstance(value, int):
+        raise ValueError(f"不明なログレベルです: {level}")
+    return value
+
+def setup_logging():
+    """"shift" ロガーにキュー経由の出力を設定（複数回呼ばれても1回だけ設定する）"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "text":
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.addHandler(NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE)))
+    root.setLevel(parse_level(LOG_LEVEL))
+    # uvicornなどが設定したルートロガーに二重に出力しない
+    root.propagate = False
+
+    for item in filter(None, (s.strip() for s in LOG_LEVELS.split(","))):
+        name, _, level = item.partition("=")
+        set_level(name.strip(), level.strip())
+
+    _listener = QueueListener(root.handlers[0].queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+def set_level(name: str, level: str):
+    """"shift" 以下のロガーの出力レベルを変更（NOTSETで親の設定に戻す）"""
+    if name != ROOT_LOGGER_NAME and not name.startswith(ROOT_LOGGER_NAME + "."):
+        raise ValueError(f"変更できるのは {ROOT_LOGGER_NAME} 以下のロガーのみです: {name}")
+    logging.getLogger(name).setLevel(parse_level(level))
+
+def get_levels() -> dict:
+    """"shift" 以下のロガーの設定レベルと実際に有効なレベル"""
+    names = [ROOT_LOGGER_NAME] + sorted(
+        name for name, logger in logging.root.manager.loggerDict.items()
+        if name.startswith(ROOT_LOGGER_NAME + ".") and isinstance(logger, logging.Logger)
+    )
+    levels = {}
+    for name in names:
+        logger = logging.getLogger(name)
+        levels[name] = {
+            "level": logging.getLevelName(logger.level),
+            "effective_level": logging.getLevelName(logger.getEffectiveLevel()),
+        }
+    return levels
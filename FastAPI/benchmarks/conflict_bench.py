@@ -0,0 +1,97 @@
+# benchmarks/conflict_bench.py
+"""確定シフトの時間帯の重複チェック（intervals.IntervalIndex）の処理時間
+
+既存の確定シフト（ユーザー数×日数、日付をまたぐシフトを含む）に対して、一括登録する
+時間帯の重複チェックを行い、全件を総当たりで比較する方法と結果・処理時間を比較します。
+インデックスの構築（DBから読み込んだ後に1回）と、チェックの時間は別に表示します。
+結果が一致しない場合は終了コード1で終了します。
+
+使い方:
+    python benchmarks/conflict_bench.py
+    python benchmarks/conflict_bench.py --users 500 --days 365 --new 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from intervals import IntervalIndex, find_overlapping_pairs
+
+def random_shift(rng: random.Random, day: datetime) -> tuple:
+    # 開始は0:00〜23:30、長さは1〜10時間（夜からのシフトは翌日にまたがる）
+    start = day + timedelta(minutes=30 * rng.randrange(48))
+    return start, start + timedelta(minutes=30 * rng.randrange(2, 21))
+
+def generate(users: int, days: int, new: int, seed: int) -> tuple:
+    rng = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    existing = {user_id: [] for user_id in range(users)}
+    shift_id = 0
+    for user_id in range(users):
+        for day in range(days):
+            if rng.random() < 0.5:
+                shift_id += 1
+                existing[user_id].append(random_shift(rng, base + timedelta(days=day)) + (shift_id,))
+    pending = [
+        (rng.randrange(users),) + random_shift(rng, base + timedelta(days=rng.randrange(days)))
+        for _ in range(new)
+    ]
+    return existing, pending
+
+def build_indexes(existing: dict) -> dict:
+    return {user_id: IntervalIndex(intervals) for user_id, intervals in existing.items()}
+
+def with_index(indexes: dict, pending: list) -> set:
+    conflicts = set()
+    by_user = {}
+    for position, (user_id, start, end) in enumerate(pending):
+        if indexes[user_id].overlapping(start, end):
+            conflicts.add(position)
+        by_user.setdefault(user_id, []).append((start, end, position))
+    for items in by_user.values():
+        for first, second in find_overlapping_pairs(items):
+            conflicts.update((first, second))
+    return conflicts
+
+def brute_force(existing: dict, pending: list) -> set:
+    conflicts = set()
+    for position, (user_id, start, end) in enumerate(pending):
+        if any(s < end and start < e for s, e, _ in existing[user_id]):
+            conflicts.add(position)
+        for other, (other_user, s, e) in enumerate(pending):
+            if other != position and other_user == user_id and s < end and start < e:
+                conflicts.add(position)
+    return conflicts
+
+def elapsed(func, *args) -> tuple:
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--new", type=int, nargs="+", default=[100, 1000, 2000], help="一括登録する件数")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for new in args.new:
+        existing, pending = generate(args.users, args.days, new, args.seed)
+        total = sum(len(intervals) for intervals in existing.values())
+        indexes, build_time = elapsed(build_indexes, existing)
+        indexed, indexed_time = elapsed(with_index, indexes, pending)
+        expected, brute_time = elapsed(brute_force, existing, pending)
+        if indexed != expected:
+            print(f"{new}件: 総当たりと結果が一致しません（{len(indexed)}件 / {len(expected)}件）")
+            sys.exit(1)
+        print(
+            f"既存 {total:6d}件  一括 {new:5d}件  重複 {len(indexed):5d}件  "
+            f"構築 {build_time * 1000:6.1f} ms  インデックス {indexed_time * 1000:7.2f} ms  総当たり {brute_time * 1000:8.1f} ms"
+        )
+
+if __name__ == "__main__":
+    run()
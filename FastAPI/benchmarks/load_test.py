@@ -0,0 +1,370 @@
+# benchmarks/load_test.py
+"""実際の利用に近い操作の組み合わせでの負荷試験（エンドポイントごとのレイテンシとスループット）
+
+seed.py で作成したデータベースでuvicornをサブプロセスとして起動し（--base-url を指定した場合は起動中のサーバーを使用）、
+--clients 人のユーザーが次の操作を重み付きでランダムに繰り返します（カッコ内は既定の割合）。
+
+    ログイン (5%)                       POST /api/v1/auth/login
+    全員の確定シフト（月）(35%)         GET  /api/v1/confirmed-shifts/all
+    自分のシフト希望（月）(20%)         GET  /api/v1/shift-requests/
+    自分の確定シフト（月）(10%)         GET  /api/v1/confirmed-shifts/
+    シフト希望の一括提出 (15%)          POST /api/v1/shift-requests/bulk（データの翌月が対象）
+    差分取得 (10%)                      GET  /api/v1/changes
+    管理者: シフト希望一覧 (2%)         GET  /api/v1/admin/shift-requests
+    管理者: 充足状況 (2%)               GET  /api/v1/admin/analytics/coverage
+    管理者: 確定シフトの一括作成 (1%)   POST /api/v1/admin/confirmed-shifts/bulk（データの期間より後の日付）
+
+閲覧する月は直近3か月が7割、残りはデータの期間全体から選びます。
+--warmup 秒の後の --duration 秒間を計測し、エンドポイントごとの件数・エラー数・req/s・p50/p95/p99（nearest-rank）を表示して、
+結果をJSONで保存します（--output、既定は benchmarks/results/load-<日時>.json）。
+--compare に以前の結果を指定すると req/s と p95 の変化を表示し、--max-regression を指定した場合は
+p95がその割合（%）より悪化したエンドポイントがあれば終了コード1で終了します。
+
+書き込みでデータが変わるため、結果を比較する場合は毎回 seed.py で作り直したデータベースを使ってください
+（同じデータベースで繰り返すと確定シフトの一括作成が409になり、conflictsとして数えます）。
+
+使い方:
+    python benchmarks/seed.py --database-url sqlite:///bench.db
+    python benchmarks/load_test.py --database-url sqlite:///bench.db --clients 50 --duration 30
+    python benchmarks/load_test.py --database-url sqlite:///bench.db --compare benchmarks/results/load-20250701-120000.json --max-regression 20
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8000
+
+必要なパッケージ: httpx
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+
+FASTAPI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import ADMIN_USERNAME, PASSWORD, user_name
+
+# (名前, 重み)。名前はメソッドとルートのテンプレート（metrics.pyのラベルと同じ形式）
+MIX = [
+    ("POST /api/v1/auth/login", 5),
+    ("GET /api/v1/confirmed-shifts/all", 35),
+    ("GET /api/v1/shift-requests/", 20),
+    ("GET /api/v1/confirmed-shifts/", 10),
+    ("POST /api/v1/shift-requests/bulk", 15),
+    ("GET /api/v1/changes", 10),
+    ("GET /api/v1/admin/shift-requests", 2),
+    ("GET /api/v1/admin/analytics/coverage", 2),
+    ("POST /api/v1/admin/confirmed-shifts/bulk", 1),
+]
+
+def start_server(database_url: str, port: int, workers: int, db_async: bool) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        DB_ASYNC="true" if db_async else "false",
+        SECRET_KEY="bench-secret",
+    )
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=FASTAPI_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+
+async def wait_until_ready(client: httpx.AsyncClient):
+    for _ in range(300):
+        try:
+            await client.get("/docs")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("サーバーが起動しませんでした")
+
+def add_months(day: date, months: int) -> date:
+    year, month = divmod(day.month - 1 + months, 12)
+    return date(day.year + year, month + 1, 1)
+
+def percentile(sorted_values: list, p: float) -> float:
+    """nearest-rank法のパーセンタイル"""
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+class Stats:
+    """エンドポイントごとのレイテンシ（ミリ秒）とステータス"""
+
+    def __init__(self):
+        self.latencies = {name: [] for name, _ in MIX}
+        self.errors = {name: 0 for name, _ in MIX}
+        self.conflicts = {name: 0 for name, _ in MIX}
+        self.recording = False
+
+    def record(self, name: str, elapsed: float, status_code: int):
+        if not self.recording:
+            return
+        self.latencies[name].append(elapsed * 1000)
+        if status_code == 409:
+            self.conflicts[name] += 1
+        elif status_code >= 400:
+            self.errors[name] += 1
+
+    @staticmethod
+    def _summary(latencies: list, errors: int, conflicts: int, duration: float) -> dict:
+        values = sorted(latencies)
+        if not values:
+            return {"requests": 0, "errors": errors, "conflicts": conflicts, "rps": 0.0}
+        return {
+            "requests": len(values),
+            "errors": errors,
+            "conflicts": conflicts,
+            "rps": round(len(values) / duration, 2),
+            "mean_ms": round(sum(values) / len(values), 2),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "max_ms": round(values[-1], 2),
+        }
+
+    def summary(self, duration: float) -> dict:
+        endpoints = {
+            name: self._summary(self.latencies[name], self.errors[name], self.conflicts[name], duration)
+            for name, _ in MIX
+        }
+        total = self._summary(
+            [value for values in self.latencies.values() for value in values],
+            sum(self.errors.values()), sum(self.conflicts.values()), duration
+        )
+        return {"endpoints": endpoints, "total": total}
+
+class Scenario:
+    """操作の組み合わせ（クライアントごとのログイン情報と、全体で共有する確定シフトの作成日）"""
+
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, start: date, months: int, seed: int):
+        self.client = client
+        self.stats = stats
+        self.first_month = start.replace(day=1)
+        self.months = months
+        self.submit_month = add_months(self.first_month, months)
+        # 確定シフトの一括作成は1回ごとに別の日付にする（データの期間の1年後から）
+        self.publish_day = add_months(self.first_month, months + 12)
+        self.rng = random.Random(seed)
+        self.admin = None
+        self.user_ids = []
+        self.names, self.weights = zip(*MIX)
+
+    async def request(self, name: str, path: str, headers: dict = None, **kwargs) -> httpx.Response:
+        method = name.split(" ", 1)[0]
+        started = time.perf_counter()
+        try:
+            r = await self.client.request(method, path, headers=headers, **kwargs)
+        except httpx.TransportError:
+            self.stats.record(name, time.perf_counter() - started, 599)
+            return None
+        self.stats.record(name, time.perf_counter() - started, r.status_code)
+        return r
+
+    async def login(self, username: str) -> dict:
+        r = await self.request("POST /api/v1/auth/login", "/api/v1/auth/login", data={"username": username, "password": PASSWORD})
+        if r is None or r.status_code != 200:
+            raise RuntimeError(f"{username} でログインできません（seed.py でデータを作成してください）")
+        return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    async def setup_user(self, n: int) -> dict:
+        username = user_name(n)
+        headers = await self.login(username)
+        me = (await self.client.get("/api/v1/auth/me", headers=headers)).json()
+        watermark = (await self.client.get("/api/v1/changes", headers=headers)).json()["watermark"]
+        self.user_ids.append(me["id"])
+        return {"username": username, "headers": headers, "watermark": watermark}
+
+    async def setup(self, clients: int) -> list:
+        self.admin = await self.login(ADMIN_USERNAME)
+        return [await self.setup_user(n) for n in range(clients)]
+
+    def pick_month(self) -> date:
+        if self.rng.random() < 0.7:
+            return add_months(self.first_month, self.months - 1 - self.rng.randrange(min(3, self.months)))
+        return add_months(self.first_month, self.rng.randrange(self.months))
+
+    def pick_operation(self) -> str:
+        return self.rng.choices(self.names, self.weights)[0]
+
+    async def run_operation(self, name: str, user: dict):
+        headers = user["headers"]
+        month = self.pick_month()
+        params = {"year": month.year, "month": month.month}
+
+        if name == "POST /api/v1/auth/login":
+            r = await self.request(name, "/api/v1/auth/login", data={"username": user["username"], "password": PASSWORD})
+            if r is not None and r.status_code == 200:
+                user["headers"] = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        elif name == "POST /api/v1/shift-requests/bulk":
+            # 翌月の平日から数日を選んで提出（既存の日付は上書き）
+            weekdays = [
+                self.submit_month + timedelta(days=i) for i in range(28)
+                if (self.submit_month + timedelta(days=i)).weekday() < 5
+            ]
+            body = []
+            for day in self.rng.sample(weekdays, self.rng.randint(5, 12)):
+                item = {"date": day.isoformat(), "canwork": self.rng.random() < 0.8}
+                if item["canwork"] and self.rng.random() < 0.5:
+                    hour = self.rng.choice([9, 10, 13, 17])
+                    item["start_time"] = f"{day.isoformat()}T{hour:02d}:00:00"
+                    item["end_time"] = f"{day.isoformat()}T{hour + 4:02d}:00:00"
+                body.append(item)
+            await self.request(name, "/api/v1/shift-requests/bulk", headers, json=body)
+        elif name == "GET /api/v1/changes":
+            r = await self.request(name, "/api/v1/changes", headers, params={"since": user["watermark"]})
+            if r is not None and r.status_code == 200:
+                user["watermark"] = r.json()["watermark"]
+        elif name == "GET /api/v1/admin/shift-requests":
+            await self.request(name, "/api/v1/admin/shift-requests", self.admin, params=params)
+        elif name == "GET /api/v1/admin/analytics/coverage":
+            await self.request(name, "/api/v1/admin/analytics/coverage", self.admin, params=params)
+        elif name == "POST /api/v1/admin/confirmed-shifts/bulk":
+            day = self.publish_day
+            self.publish_day += timedelta(days=1)
+            user_ids = self.rng.sample(self.user_ids, min(len(self.user_ids), 10))
+            body = [
+                {"date": day.isoformat(), "start_time": "10:00", "end_time": "15:00", "user_id": user_id}
+                for user_id in user_ids
+            ]
+            await self.request(name, "/api/v1/admin/confirmed-shifts/bulk", self.admin, json=body)
+        else:
+            await self.request(name, name.split(" ", 1)[1], headers, params=params)
+
+    async def worker(self, user: dict, deadline: float):
+        while time.perf_counter() < deadline:
+            await self.run_operation(self.pick_operation(), user)
+
+async def run_load(base_url: str, clients: int, warmup: float, duration: float, start: date, months: int, seed: int) -> dict:
+    limits = httpx.Limits(max_connections=clients + 1, max_keepalive_connections=clients + 1)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await wait_until_ready(client)
+        stats = Stats()
+        scenario = Scenario(client, stats, start, months, seed)
+        users = await scenario.setup(clients)
+
+        deadline = time.perf_counter() + warmup + duration
+        workers = [asyncio.ensure_future(scenario.worker(user, deadline)) for user in users]
+        await asyncio.sleep(warmup)
+        stats.recording = True
+        measured_from = time.perf_counter()
+        await asyncio.gather(*workers)
+        stats.recording = False
+        return stats.summary(time.perf_counter() - measured_from)
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=FASTAPI_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(result: dict):
+    print(f"{'endpoint':45s} {'requests':>8s} {'errors':>6s} {'req/s':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s}")
+    rows = list(result["endpoints"].items()) + [("合計", result["total"])]
+    for name, summary in rows:
+        if not summary["requests"]:
+            print(f"{name:45s} {0:8d} {summary['errors']:6d}")
+            continue
+        print(
+            f"{name:45s} {summary['requests']:8d} {summary['errors']:6d} {summary['rps']:8.1f} "
+            f"{summary['p50_ms']:8.1f} {summary['p95_ms']:8.1f} {summary['p99_ms']:8.1f}"
+        )
+
+def compare_results(result: dict, baseline: dict, max_regression: float = None) -> bool:
+    """以前の結果との比較を表示。p95がmax_regression（%）より悪化したエンドポイントがあればFalse"""
+    def change(new, old):
+        return (new - old) / old * 100 if old else 0.0
+
+    print(f"\n比較: {baseline.get('created_at')} (commit {str(baseline.get('git_commit'))[:10]})")
+    print(f"{'endpoint':45s} {'req/s':>16s} {'p95 (ms)':>20s}")
+    ok = True
+    rows = list(result["endpoints"].items()) + [("合計", result["total"])]
+    for name, summary in rows:
+        old = baseline["total"] if name == "合計" else baseline["endpoints"].get(name)
+        if not old or not old.get("requests") or not summary["requests"]:
+            continue
+        p95_change = change(summary["p95_ms"], old["p95_ms"])
+        regressed = max_regression is not None and p95_change > max_regression
+        ok = ok and not regressed
+        print(
+            f"{name:45s} {summary['rps']:8.1f} ({change(summary['rps'], old['rps']):+5.1f}%) "
+            f"{summary['p95_ms']:9.1f} ({p95_change:+6.1f}%){'  ← 悪化' if regressed else ''}"
+        )
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///bench.db", help="seed.py で作成したデータベース")
+    parser.add_argument("--base-url", help="起動中のサーバーを使う場合のURL（--database-url などは無視）")
+    parser.add_argument("--db-async", action="store_true", help="サーバーを非同期モード（DB_ASYNC=true）で起動")
+    parser.add_argument("--workers", type=int, default=1, help="uvicornのワーカー数")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--clients", type=int, default=50, help="同時に操作するユーザー数（seed.py の --users 以下）")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2024, 4, 1), help="seed.py と同じ値を指定")
+    parser.add_argument("--months", type=int, default=24, help="seed.py と同じ値を指定")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="結果のJSONの保存先")
+    parser.add_argument("--compare", help="比較する以前の結果のJSON")
+    parser.add_argument("--max-regression", type=float, help="p95の悪化の許容範囲（%%）")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = start_server(args.database_url, args.port, args.workers, args.db_async)
+        base_url = f"http://127.0.0.1:{args.port}"
+    created_at = datetime.now()
+    try:
+        result = asyncio.run(run_load(
+            base_url, args.clients, args.warmup, args.duration, args.start, args.months, args.seed
+        ))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "created_at": created_at.isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "base_url": args.base_url,
+            "database": None if args.base_url else args.database_url.split("://", 1)[0],
+            "db_async": args.db_async,
+            "workers": args.workers,
+            "clients": args.clients,
+            "warmup": args.warmup,
+            "duration": args.duration,
+            "seed": args.seed,
+            "mix": dict(MIX),
+        },
+        **result,
+    }
+    output = args.output or os.path.join(
+        FASTAPI_DIR, "benchmarks", "results", f"load-{created_at:%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_results(report)
+    print(f"\n結果を保存しました: {output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare_results(report, baseline, args.max_regression):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/schedule_bench.py
+"""自動割り当て（scheduler.assign_shifts）の処理時間
+
+ランダムなシフト希望（ユーザー数×31日、各ユーザーが一定の割合の日に勤務可能）を作成し、
+割り当てにかかる時間を計測します。結果が制約（候補のみ・各日の必要人数以下・
+1人あたりの上限以下）を満たし、割り当て数が上限なしの最大流と一致することも確認します。
+制約を満たさない場合は終了コード1で終了します。
+
+使い方:
+    python benchmarks/schedule_bench.py
+    python benchmarks/schedule_bench.py --users 500 --headcount 40 --availability 0.6
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scheduler import assign_shifts, _solve_with_limit
+
+def generate(users: int, days: int, availability: float, max_existing: int, seed: int) -> tuple:
+    rng = random.Random(seed)
+    start = date(2025, 7, 1)
+    day_list = [start + timedelta(days=i) for i in range(days)]
+    # ユーザーごとに勤務しやすさを変え、希望が一部の人に偏るようにする
+    weights = {user_id: min(1.0, availability * rng.uniform(0.3, 1.7)) for user_id in range(1, users + 1)}
+    candidates = {
+        day: [user_id for user_id, weight in weights.items() if rng.random() < weight]
+        for day in day_list
+    }
+    existing_load = {user_id: rng.randint(0, max_existing) for user_id in weights}
+    return day_list, candidates, existing_load
+
+def check(candidates: dict, targets: dict, existing_load: dict, assignments: dict, limit: int) -> list:
+    errors = []
+    load = dict(existing_load)
+    for day, user_ids in assignments.items():
+        if len(user_ids) > targets[day]:
+            errors.append(f"{day}: 必要人数を超えています ({len(user_ids)} > {targets[day]})")
+        if len(set(user_ids)) != len(user_ids):
+            errors.append(f"{day}: 同じユーザーが重複しています")
+        for user_id in user_ids:
+            if user_id not in candidates[day]:
+                errors.append(f"{day}: 勤務可能でないユーザーです ({user_id})")
+            load[user_id] = load.get(user_id, 0) + 1
+    assigned_users = {user_id for user_ids in assignments.values() for user_id in user_ids}
+    over = [user_id for user_id in assigned_users if load[user_id] > limit]
+    if over:
+        errors.append(f"上限 {limit} を超えるユーザーがいます ({over[:10]})")
+    return errors
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 300, 500])
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--headcount", type=int, default=None, help="1日あたりの必要人数（既定はユーザー数の1/10）")
+    parser.add_argument("--availability", type=float, default=0.5, help="各日に勤務可能な割合の平均")
+    parser.add_argument("--max-existing", type=int, default=2, help="既存の確定シフト数の最大値")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    failed = False
+    for users in args.users:
+        headcount = args.headcount if args.headcount is not None else max(1, users // 10)
+        day_list, candidates, existing_load = generate(users, args.days, args.availability, args.max_existing, args.seed)
+        targets = {day: headcount for day in day_list}
+        edges = sum(len(user_ids) for user_ids in candidates.values())
+
+        elapsed = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            assignments, limit = assign_shifts(candidates, targets, existing_load)
+            elapsed.append(time.perf_counter() - started)
+
+        all_users = sorted(existing_load)
+        best_total, _ = _solve_with_limit(candidates, targets, existing_load, all_users, max(existing_load.values()) + len(day_list))
+        total = sum(len(user_ids) for user_ids in assignments.values())
+        errors = check(candidates, targets, existing_load, assignments, limit)
+        if total != best_total:
+            errors.append(f"割り当て数が最大ではありません ({total} < {best_total})")
+        for error in errors[:10]:
+            print("エラー:", error)
+        failed = failed or bool(errors)
+
+        print(
+            f"ユーザー {users:4d} × {len(day_list)}日  希望 {edges:6d}件  必要人数 {headcount:3d}/日  "
+            f"割り当て {total:5d}/{headcount * len(day_list):5d}  上限 {limit:2d}  "
+            f"{min(elapsed) * 1000:7.1f} ms"
+        )
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,116 @@
+# benchmarks/serialize_bench.py
+"""一覧レスポンスの作成速度（行/秒）の比較
+
+以前: 行ごとに ConfirmedShift / ShiftRequest を作成し、FastAPIがresponse_modelで
+      もう一度検証してからJSONにする（FastAPI 0.104 の serialize_response と同じ手順を再現）
+現在: 行から辞書を直接作成し、orjsonでJSONにする（ORJSONResponse）
+
+SQLiteのメモリDBにデータを作成し、同じ行に対して両方の方法を実行します。
+出力されるJSONが同じ内容であることも確認します。
+
+使い方:
+    python benchmarks/serialize_bench.py --rows 5000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from pydantic import TypeAdapter
+
+import main
+from main import ConfirmedShift, ShiftRequest, to_jst_time_string
+
+def seed(db, rows: int):
+    users = [main.UserModel(username=f"user{i}", DisplayName=f"ユーザー{i}", hashed_password="x") for i in range(50)]
+    db.add_all(users)
+    db.flush()
+    start = date(2025, 1, 1)
+    confirmed, requests = [], []
+    for n in range(rows):
+        user = users[n % len(users)]
+        day = start + timedelta(days=n // len(users))
+        begin = datetime.combine(day, datetime.min.time()) + timedelta(hours=1)
+        confirmed.append({"date": day, "start_time": begin, "end_time": begin + timedelta(hours=8), "user_id": user.id})
+        requests.append({"date": day, "canwork": n % 3 != 0, "description": "備考" if n % 5 == 0 else None,
+                         "start_time": begin, "end_time": begin + timedelta(hours=8), "user_id": user.id})
+    db.execute(main.ConfirmedShiftModel.__table__.insert(), confirmed)
+    db.execute(main.ShiftRequestModel.__table__.insert(), requests)
+    db.commit()
+
+# 以前の実装: モデルを作成 → FastAPIが辞書に戻す → response_modelで再検証 → JSON化
+def fastapi_serialize(adapter: TypeAdapter, models: list) -> bytes:
+    content = [m.model_dump(by_alias=True) for m in models]
+    value = adapter.validate_python(content)
+    jsonable = adapter.dump_python(value, mode="json")
+    return json.dumps(jsonable, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def before_confirmed(rows) -> bytes:
+    models = [
+        ConfirmedShift(**{
+            "id": row.id,
+            "date": row.date,
+            "start_time": to_jst_time_string(row.start_time),
+            "end_time": to_jst_time_string(row.end_time),
+            "user_id": row.user_id,
+            "user": {"id": row.user_id, "username": row.username, "DisplayName": row.DisplayName, "admin": row.admin},
+        })
+        for row in rows
+    ]
+    return fastapi_serialize(CONFIRMED_ADAPTER, models)
+
+def before_requests(rows) -> bytes:
+    return fastapi_serialize(REQUEST_ADAPTER, [ShiftRequest(**row._asdict()) for row in rows])
+
+def after_confirmed(rows) -> bytes:
+    return orjson.dumps([main.confirmed_shift_row_to_dict(row) for row in rows])
+
+def after_requests(rows) -> bytes:
+    return orjson.dumps([main.shift_request_row_to_dict(row) for row in rows])
+
+CONFIRMED_ADAPTER = TypeAdapter(List[ConfirmedShift])
+REQUEST_ADAPTER = TypeAdapter(List[ShiftRequest])
+
+def rows_per_second(func, rows, repeat: int) -> float:
+    best = min(_elapsed(func, rows) for _ in range(repeat))
+    return len(rows) / best
+
+def _elapsed(func, rows) -> float:
+    started = time.perf_counter()
+    func(rows)
+    return time.perf_counter() - started
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    main.Base.metadata.create_all(bind=main.engine)
+    with main.SessionLocal() as db:
+        seed(db, args.rows)
+        confirmed_rows = main.query_confirmed_shifts(db)
+        request_rows = main.query_shift_requests(db)
+
+    cases = [
+        ("確定シフト", confirmed_rows, before_confirmed, after_confirmed),
+        ("シフト希望", request_rows, before_requests, after_requests),
+    ]
+    for name, rows, before, after in cases:
+        if json.loads(before(rows)) != json.loads(after(rows)):
+            print(f"{name}: 以前の実装と出力が一致しません")
+            sys.exit(1)
+        before_rps = rows_per_second(before, rows, args.repeat)
+        after_rps = rows_per_second(after, rows, args.repeat)
+        print(f"{name}: {len(rows)}行  以前 {before_rps:10.0f} 行/秒  現在 {after_rps:10.0f} 行/秒  ({after_rps / before_rps:.1f}倍)")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,51 @@
+# benchmarks/timeconv_bench.py
+"""timeconv の時刻変換と、以前の ZoneInfo を使う実装との処理時間の比較
+
+1回あたりの処理時間を表示します。以前の実装と結果が一致することは tests/test_timeconv.py で確認しています。
+
+使い方:
+    python benchmarks/timeconv_bench.py
+    python benchmarks/timeconv_bench.py --number 200000
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, date
+
+FASTAPI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FASTAPI_DIR)
+sys.path.insert(0, os.path.join(FASTAPI_DIR, "tests"))
+import timeconv
+from timeconv_reference import (
+    reference_to_jst_time_string,
+    reference_from_time_string_to_utc_datetime,
+    reference_from_utc_to_jst_datetime,
+)
+
+# ===========================================
+# 計測
+# ===========================================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100000, help="1ケースあたりの実行回数")
+    args = parser.parse_args()
+
+    dt = datetime(2025, 7, 1, 1, 30)
+    d = date(2025, 7, 1)
+    cases = [
+        ("to_jst_time_string", reference_to_jst_time_string, timeconv.to_jst_time_string, (dt,)),
+        ("from_time_string (HH:mm)", reference_from_time_string_to_utc_datetime,
+         timeconv.from_time_string_to_utc_datetime, ("18:00", d)),
+        ("from_time_string (ISO)", reference_from_time_string_to_utc_datetime,
+         timeconv.from_time_string_to_utc_datetime, ("2025-07-09T18:00:00.000Z", d)),
+        ("from_utc_to_jst_datetime", reference_from_utc_to_jst_datetime, timeconv.from_utc_to_jst_datetime, (dt, d)),
+    ]
+    for name, before, after, call_args in cases:
+        before_ns = min(timeit.repeat(lambda: before(*call_args), number=args.number, repeat=3)) / args.number * 1e9
+        after_ns = min(timeit.repeat(lambda: after(*call_args), number=args.number, repeat=3)) / args.number * 1e9
+        print(f"{name:28s} 以前 {before_ns:8.0f} ns  現在 {after_ns:8.0f} ns  ({before_ns / after_ns:5.1f}倍)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,459 @@
+# cache.py
+"""キャッシュ
+
+アプリケーションからは CacheBackend のインターフェース（値はbytes）を通して使います。
+
+    memory  プロセス内のLRU（ワーカー1つの場合やテスト用）
+    socket  キャッシュサーバー（python cache.py）をUnixソケットまたはlocalhostのTCPで共有。
+            複数のuvicornワーカーが同じ内容を参照する
+
+キャッシュサーバーは変更通知のpub/sub（pubsub.SocketPubSub）の中継も行います。
+
+無効化はバージョン番号（incr）で行います。値にバージョンを含めて保存し、
+読み込み時に現在のバージョンと一致しなければ古い値として扱うことで、
+どのワーカーで書き込みがあっても全ワーカーが同じ結果を見られます。
+
+キャッシュサーバーの起動:
+    python cache.py --socket /tmp/shift-cache.sock
+    python cache.py --socket 127.0.0.1:6390
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger("shift.cache")
+
+# キャッシュに存在しないことを表す値（Noneもキャッシュできるようにするため）
+MISSING = object()
+
+# get_manyで保存先が空の状態から動き始めた時刻（10進数の文字列）を読むためのキー。
+# カウンターと同じ応答で読めば、キャッシュサーバーの再起動でカウンターが0に戻ったことを検出できる
+STARTED_AT_KEY = "cache:started_at"
+
+class CacheUnavailableError(Exception):
+    """キャッシュサーバーに問い合わせできない（set_persistent / get_persistent）"""
+
+class LRUCache:
+    """件数と合計サイズの上限付きのスレッドセーフなLRUキャッシュ
+
+    上限を超えると最も長く使われていないエントリから削除する。
+    サイズはsizeof(value)で計算する（既定はlen）。
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int = None, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            self._pop(key)
+            # 1件で上限を超えるものは保持しない
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._data[key] = (value, size)
+            self._total_bytes += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._total_bytes > self.max_bytes
+            ):
+                self._pop(next(iter(self._data)))
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._total_bytes = 0
+
+    def _pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+# ===========================================
+# バックエンド
+# ===========================================
+
+class CacheBackend:
+    """キャッシュのインターフェース（キーはstr、値はbytes）"""
+
+    def get_many(self, keys: list) -> list:
+        """各キーの値（存在しない・期限切れならNone）を同じ順序で返す"""
+        raise NotImplementedError
+
+    def get(self, key: str):
+        return self.get_many([key])[0]
+
+    def set(self, key: str, value: bytes, ttl_seconds: float = None):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def incr(self, key: str, strict: bool = False) -> int:
+        """カウンター（バージョン番号）を1増やして新しい値を返す。get_manyでは10進数の文字列として読める
+
+        カウンターはLRUの上限による削除の対象にならない。キャッシュサーバーの再起動で0に戻る（STARTED_AT_KEY）。
+        利用できない場合は0を返す（strictならCacheUnavailableError）。
+        """
+        raise NotImplementedError
+
+    def set_persistent(self, key: str, value: bytes, ttl_seconds: float):
+        """LRUの上限による削除の対象にならない値を保存（有効期限で削除）。失われると困る記録に使う
+
+        保存できない場合はCacheUnavailableError。
+        """
+        raise NotImplementedError
+
+    def get_persistent(self, key: str) -> tuple:
+        """set_persistentで保存した値（なければNone）と、保存先が空の状態から動き始めた時刻（time.time()）の組
+
+        その時刻より前に保存された値は（キャッシュサーバーの再起動などで）失われている。
+        問い合わせできない場合はCacheUnavailableError。
+        """
+        raise NotImplementedError
+
+class MemoryBackend(CacheBackend):
+    """プロセス内のLRUキャッシュ（有効期限付き）"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = None):
+        self._values = LRUCache(max_entries, max_bytes, sizeof=lambda entry: len(entry[0]))
+        self._counters = {}
+        # キー → (値, 期限)。期限切れのものは件数が前回の掃除の2倍になったときにまとめて削除する
+        self._persistent = {}
+        self._persistent_purge_size = 1024
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def get_many(self, keys: list) -> list:
+        now = time.monotonic()
+        values = []
+        for key in keys:
+            if key == STARTED_AT_KEY:
+                values.append(repr(self.started_at).encode())
+                continue
+            counter = self._counters.get(key)
+            if counter is not None:
+                values.append(str(counter).encode())
+                continue
+            entry = self._values.get(key, None)
+            if entry is not None and entry[1] is not None and entry[1] <= now:
+                self._values.delete(key)
+                entry = None
+            values.append(None if entry is None else entry[0])
+        return values
+
+    def set(self, key: str, value: bytes, ttl_seconds: float = None):
+        expires_at = None if ttl_seconds is None else time.monotonic() + ttl_seconds
+        self._values.set(key, (value, expires_at))
+
+    def delete(self, key: str):
+        self._values.delete(key)
+
+    def incr(self, key: str, strict: bool = False) -> int:
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def set_persistent(self, key: str, value: bytes, ttl_seconds: float):
+        now = time.monotonic()
+        with self._lock:
+            self._persistent[key] = (value, now + ttl_seconds)
+            if len(self._persistent) >= self._persistent_purge_size:
+                self._persistent = {k: entry for k, entry in self._persistent.items() if entry[1] > now}
+                self._persistent_purge_size = max(1024, len(self._persistent) * 2)
+
+    def get_persistent(self, key: str) -> tuple:
+        with self._lock:
+            entry = self._persistent.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._persistent[key]
+                entry = None
+        return (None if entry is None else entry[0]), self.started_at
+
+# 通信フォーマット: ヘッダー長・本体長(各4バイト) + ヘッダー(JSON) + 本体(値のbytesを連結)
+_FRAME = struct.Struct("!II")
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("キャッシュサーバーとの接続が切断されました")
+        received += n
+    return bytes(buffer)
+
+def send_message(sock: socket.socket, header: dict, blobs: list = ()):
+    header = dict(header, sizes=[None if blob is None else len(blob) for blob in blobs])
+    header_bytes = json.dumps(header).encode()
+    body = b"".join(blob for blob in blobs if blob is not None)
+    sock.sendall(_FRAME.pack(len(header_bytes), len(body)) + header_bytes)
+    if body:
+        sock.sendall(body)
+
+def recv_message(sock: socket.socket) -> tuple:
+    header_size, body_size = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    header = json.loads(_recv_exact(sock, header_size))
+    body = _recv_exact(sock, body_size) if body_size else b""
+    blobs, position = [], 0
+    for size in header.pop("sizes"):
+        if size is None:
+            blobs.append(None)
+        else:
+            blobs.append(body[position:position + size])
+            position += size
+    return header, blobs
+
+def parse_address(address: str):
+    """"host:port" ならTCP、それ以外はUnixソケットのパスとして扱う"""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+class SocketBackend(CacheBackend):
+    """キャッシュサーバーを使うバックエンド（スレッドごとに接続を保持）
+
+    サーバーに接続できない場合はキャッシュなしとして動作する（読み込みはNone、書き込みは無視）。
+    set_persistent / get_persistent と、strictを指定したincrだけはCacheUnavailableErrorを送出する。
+    """
+
+    def __init__(self, address: str, timeout: float = 1.0):
+        self.family, self.address = parse_address(address)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(self.family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.address)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+
+    def _call(self, header: dict, blobs: list = (), strict: bool = False):
+        """応答の(ヘッダー, 値)。利用できない場合はNone（strictならCacheUnavailableError）"""
+        # 切断済みの接続を使った場合に備えて1回だけ再接続する
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                send_message(sock, header, blobs)
+                return recv_message(sock)
+            except (OSError, ValueError) as e:
+                self._close()
+                if attempt == 1:
+                    logger.warning("キャッシュサーバーを利用できません: %s (%s)", e, header["op"])
+                    if strict:
+                        raise CacheUnavailableError(str(e)) from e
+                    return None
+
+    def get_many(self, keys: list) -> list:
+        reply = self._call({"op": "get_many", "keys": keys})
+        return [None] * len(keys) if reply is None else reply[1]
+
+    def set(self, key: str, value: bytes, ttl_seconds: float = None):
+        self._call({"op": "set", "key": key, "ttl": ttl_seconds}, [value])
+
+    def delete(self, key: str):
+        self._call({"op": "delete", "key": key})
+
+    def incr(self, key: str, strict: bool = False) -> int:
+        reply = self._call({"op": "incr", "key": key}, strict=strict)
+        return 0 if reply is None else reply[0]["value"]
+
+    def set_persistent(self, key: str, value: bytes, ttl_seconds: float):
+        self._call({"op": "set_persistent", "key": key, "ttl": ttl_seconds}, [value], strict=True)
+
+    def get_persistent(self, key: str) -> tuple:
+        header, blobs = self._call({"op": "get_persistent", "key": key}, strict=True)
+        return blobs[0], header["started_at"]
+
+    def publish(self, channel: str, message: bytes) -> bool:
+        """チャンネルを購読している全接続にメッセージを送る（サーバーに接続できなければFalse）"""
+        return self._call({"op": "publish", "channel": channel}, [message]) is not None
+
+# ===========================================
+# キャッシュサーバー
+# ===========================================
+
+class _Subscribers:
+    """pub/subの購読中の接続（送信は接続ごとのロックで直列化し、送れない接続は外す）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connections = {}
+
+    def add(self, sock: socket.socket, channels: list):
+        with self._lock:
+            self._connections[sock] = (threading.Lock(), set(channels))
+
+    def remove(self, sock: socket.socket):
+        with self._lock:
+            self._connections.pop(sock, None)
+
+    def broadcast(self, channel: str, message: bytes):
+        with self._lock:
+            targets = [(sock, lock) for sock, (lock, channels) in self._connections.items() if channel in channels]
+        for sock, lock in targets:
+            try:
+                with lock:
+                    send_message(sock, {"channel": channel}, [message])
+            except OSError as e:
+                logger.warning("購読中の接続に送信できないため切断します: %s", e)
+                self.remove(sock)
+
+# 購読中の接続への送信が詰まった場合に待つ時間（秒）。他の接続への配信を止めないため短くする
+_SUBSCRIBER_SEND_TIMEOUT = 1.0
+
+class _CacheRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        backend = self.server.backend
+        while True:
+            try:
+                header, blobs = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            op = header["op"]
+            if op == "subscribe":
+                self._serve_subscriber(header["channels"])
+                return
+            if op == "get_many":
+                send_message(self.request, {}, backend.get_many(header["keys"]))
+            elif op == "set":
+                backend.set(header["key"], blobs[0], header.get("ttl"))
+                send_message(self.request, {})
+            elif op == "delete":
+                backend.delete(header["key"])
+                send_message(self.request, {})
+            elif op == "incr":
+                send_message(self.request, {"value": backend.incr(header["key"])})
+            elif op == "set_persistent":
+                backend.set_persistent(header["key"], blobs[0], header["ttl"])
+                send_message(self.request, {})
+            elif op == "get_persistent":
+                value, started_at = backend.get_persistent(header["key"])
+                send_message(self.request, {"started_at": started_at}, [value])
+            elif op == "publish":
+                self.server.subscribers.broadcast(header["channel"], blobs[0])
+                send_message(self.request, {})
+            else:
+                return
+
+    def _serve_subscriber(self, channels: list):
+        """購読を登録し、接続が閉じられるまで待つ（以降この接続には配信だけを行う）"""
+        subscribers = self.server.subscribers
+        self.request.settimeout(_SUBSCRIBER_SEND_TIMEOUT)
+        send_message(self.request, {})
+        subscribers.add(self.request, channels)
+        try:
+            while True:
+                try:
+                    if not self.request.recv(1):
+                        return
+                except socket.timeout:
+                    continue
+                except OSError:
+                    return
+        finally:
+            subscribers.remove(self.request)
+
+class _UnixCacheServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class _TCPCacheServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class CacheServer:
+    """複数ワーカーで共有するキャッシュサーバー
+
+    通常は別プロセス（python cache.py）として起動する。テストでは start_in_thread で
+    同じプロセス内に起動し、SocketBackend から接続できる。
+    """
+
+    def __init__(self, address: str, backend: CacheBackend = None):
+        family, self.address = parse_address(address)
+        self.backend = backend or MemoryBackend()
+        if family == socket.AF_UNIX:
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            self._server = _UnixCacheServer(self.address, _CacheRequestHandler)
+        else:
+            self._server = _TCPCacheServer(self.address, _CacheRequestHandler)
+        self._server.backend = self.backend
+        self._server.subscribers = _Subscribers()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="cache-server", daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+def create_backend(kind: str, address: str = None, max_entries: int = 10000, max_bytes: int = None) -> CacheBackend:
+    """設定（CACHE_BACKEND / CACHE_SOCKET）からバックエンドを作成"""
+    if kind == "memory":
+        return MemoryBackend(max_entries, max_bytes)
+    if kind == "socket":
+        if not address:
+            raise ValueError("CACHE_BACKEND=socket の場合は CACHE_SOCKET を指定してください。")
+        return SocketBackend(address)
+    raise ValueError(f"不明なキャッシュバックエンドです: {kind}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="複数ワーカーで共有するキャッシュサーバー")
+    parser.add_argument("--socket", default=os.getenv("CACHE_SOCKET", "/tmp/shift-cache.sock"),
+                        help="Unixソケットのパス、または host:port")
+    parser.add_argument("--max-entries", type=int, default=int(os.getenv("CACHE_MAX_ENTRIES", "10000")))
+    parser.add_argument("--max-bytes", type=int, default=int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    server = CacheServer(args.socket, MemoryBackend(args.max_entries, args.max_bytes))
+    logger.info("キャッシュサーバーを起動しました: %s", args.socket)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
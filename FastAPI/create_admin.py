@@ -1,12 +1,12 @@
 from sqlalchemy.orm import Session
-from main import SessionLocal, User, get_password_hash
+from main import SessionLocal, UserModel, get_password_hash
 import sys
 
 def create_admin_user():
     db = SessionLocal()
     try:
         # 既存の管理者ユーザーをチェック
-        existing_admin = db.query(User).filter(User.admin == True).first()
+        existing_admin = db.query(UserModel).filter(UserModel.admin == True).first()
         if existing_admin:
             print(f"管理者ユーザー '{existing_admin.username}' が既に存在します。")
             return
@@ -21,11 +21,12 @@ def create_admin_user():
             return
         
         # ユーザー名の重複チェック
-        if db.query(User).filter(User.username == username).first():
+        if db.query(UserModel).filter(UserModel.username == username).first():
             print("そのユーザー名は既に使用されています。")
             return
         
-        admin_user = User(
+        # BCRYPT_ROUNDSの設定に従ってハッシュ化（対話スクリプトのため同期で実行）
+        admin_user = UserModel(
             username=username,
             DisplayName=display_name,
             hashed_password=get_password_hash(password),
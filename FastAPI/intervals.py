@@ -0,0 +1,79 @@
+# intervals.py
+"""時間帯（区間）の重なりの検索
+
+確定シフトの時間帯の重複チェックに使います。区間は [開始, 終了)（終了時刻ちょうどに始まる区間とは重ならない）。
+"""
+import bisect
+
+class IntervalIndex:
+    """区間 (開始, 終了, キー) を開始時刻順に保持し、重なる区間を二分探索で検索する
+
+    保持している区間の最大の長さを記録しておき、[start, end) と重なり得る区間を
+    開始時刻が (start − 最大の長さ, end) の範囲にあるものに絞る。
+    シフトのように長さの上限がある区間では、検索は O(log n + 重なりの候補数) になる。
+    """
+
+    def __init__(self, intervals=()):
+        self._entries = sorted(intervals, key=lambda entry: entry[0])
+        self._starts = [entry[0] for entry in self._entries]
+        self._keys = {entry[2] for entry in self._entries}
+        self._max_length = max((end - start for start, end, _ in self._entries), default=None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def copy(self) -> "IntervalIndex":
+        index = IntervalIndex.__new__(IntervalIndex)
+        index._entries = list(self._entries)
+        index._starts = list(self._starts)
+        index._keys = set(self._keys)
+        index._max_length = self._max_length
+        return index
+
+    def add(self, start, end, key):
+        """区間を追加（同じキーが既にあれば何もしない）"""
+        if key in self._keys:
+            return
+        self._keys.add(key)
+        position = bisect.bisect_right(self._starts, start)
+        self._starts.insert(position, start)
+        self._entries.insert(position, (start, end, key))
+        if self._max_length is None or end - start > self._max_length:
+            self._max_length = end - start
+
+    def remove(self, key) -> bool:
+        """キーが一致する区間を削除（最大の長さは縮めない。検索範囲が広めになるだけで結果は変わらない）"""
+        if key not in self._keys:
+            return False
+        self._keys.discard(key)
+        for position, entry in enumerate(self._entries):
+            if entry[2] == key:
+                del self._entries[position]
+                del self._starts[position]
+                return True
+        return False
+
+    def overlapping(self, start, end, ignore=None) -> list:
+        """[start, end) と重なる区間のキー（ignoreのキーは除く）"""
+        if self._max_length is None:
+            return []
+        low = bisect.bisect_right(self._starts, start - self._max_length)
+        high = bisect.bisect_left(self._starts, end)
+        return [
+            key for entry_start, entry_end, key in self._entries[low:high]
+            if entry_end > start and entry_start < end and key != ignore
+        ]
+
+def find_overlapping_pairs(intervals: list) -> list:
+    """区間 (開始, 終了, キー) のリストの中で互いに重なる組を (キー, キー) で返す（ソートして1回走査、O(n log n)）
+
+    各区間について、それより前に始まる区間のうち終了が最も遅いものとの重なりだけを報告する。
+    """
+    pairs = []
+    latest = None
+    for start, end, key in sorted(intervals, key=lambda entry: (entry[0], entry[1])):
+        if latest is not None and latest[1] > start:
+            pairs.append((latest[2], key))
+        if latest is None or end > latest[1]:
+            latest = (start, end, key)
+    return pairs
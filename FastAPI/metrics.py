@@ -0,0 +1,265 @@
+# metrics.py
+"""リクエスト・DBのメトリクス（Prometheusのテキスト形式で出力）
+
+    MetricsMiddleware   ルートごとの処理時間・レスポンスサイズ・SQLの実行回数と時間を記録するASGIミドルウェア
+    instrument_engine   SQLAlchemyのエンジンにSQLの計測（before/after_cursor_execute）と
+                        コネクションプールの計測（checkout/connect）を追加する
+
+ルートはパスではなくルートのテンプレート（/api/v1/shift-requests/{request_id}）で集計し、
+どのルートにも一致しないリクエストは "unmatched" にまとめます（ラベルの数が増え続けないようにする）。
+値はワーカー（プロセス）ごとに集計されます。
+"""
+import bisect
+import contextvars
+import threading
+import time
+
+# 処理時間（秒）とレスポンスサイズ（バイト）・SQLの実行回数のヒストグラムの区切り
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+class Registry:
+    """メトリクスの保持（ラベルの組ごとの値。更新は1つのロックで行う）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1):
+        self.inc_many([(name, labels, value)])
+
+    def inc_many(self, increments: list):
+        """[(名前, ラベル, 値)] をまとめて加算（ロックを1回だけ取る）"""
+        with self._lock:
+            for name, labels, value in increments:
+                key = (name, labels)
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe_many(self, observations: list):
+        """[(名前, ラベル, 区切り, 値)] をまとめて記録（ロックを1回だけ取る）"""
+        with self._lock:
+            for name, labels, buckets, value in observations:
+                histogram = self._histograms.get((name, labels))
+                if histogram is None:
+                    histogram = self._histograms[(name, labels)] = _Histogram(buckets)
+                histogram.observe(value)
+
+    def add_collector(self, collector):
+        """出力時に呼び出し、[(名前, ラベル, 値)] を返す関数（ゲージ）を登録"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(
+                ((key, list(h.counts), h.total, h.count, h.buckets) for key, h in self._histograms.items()),
+                key=lambda item: item[0]
+            )
+        gauges = sorted(sample for collector in self._collectors for sample in collector())
+
+        lines = []
+        described = set()
+
+        def header(name: str):
+            if name not in described and name in self._help:
+                kind, help_text = self._help[name]
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            described.add(name)
+
+        for (name, labels), value in counters:
+            header(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, labels, value in gauges:
+            header(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), counts, total, count, buckets in histograms:
+            header(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+def _format_value(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+registry = Registry()
+registry.describe("http_requests_total", "counter", "処理したリクエスト数")
+registry.describe("http_request_duration_seconds", "histogram", "リクエストの処理時間（秒）")
+registry.describe("http_response_size_bytes", "histogram", "レスポンス本体のサイズ（バイト）")
+registry.describe("http_request_db_statements", "histogram", "1リクエストで実行したSQLの数")
+registry.describe("http_request_db_seconds", "histogram", "1リクエストでSQLの実行にかかった時間（秒）")
+registry.describe("db_statements_total", "counter", "実行したSQLの数（リクエスト外を含む）")
+registry.describe("db_statement_seconds_total", "counter", "SQLの実行にかかった時間の合計（秒）")
+registry.describe("db_pool_size", "gauge", "コネクションプールの大きさ（pool_size）")
+registry.describe("db_pool_checked_out", "gauge", "使用中のコネクション数")
+registry.describe("db_pool_checked_in", "gauge", "プール内で待機中のコネクション数")
+registry.describe("db_pool_overflow", "gauge", "pool_sizeを超えて作成されているコネクション数（負の値は未作成の枠）")
+registry.describe("db_pool_checkouts_total", "counter", "プールからコネクションを取り出した回数")
+registry.describe("db_pool_connections_total", "counter", "新しく作成したDB接続の数")
+registry.describe("db_pool_timeouts_total", "counter", "接続が空かずに503を返したリクエストの数")
+registry.describe("password_hash_queue_depth", "gauge", "実行中と待機中のパスワードハッシュ計算の数")
+registry.describe("password_hash_rejections_total", "counter", "ハッシュ計算の上限を超えて503を返したリクエストの数")
+
+# ===========================================
+# SQLの計測
+# ===========================================
+
+class _RequestStats:
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+# 処理中のリクエストのSQLの集計（スレッドプール・run_syncで実行されるエンドポイントにも引き継がれる）
+_request_stats = contextvars.ContextVar("request_db_stats", default=None)
+
+def instrument_engine(engine, name: str = "primary"):
+    """エンジンにSQLの実行時間とコネクションプールの計測を追加"""
+    from sqlalchemy import event
+
+    labels = (("engine", name),)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        elapsed = time.perf_counter() - started
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.seconds += elapsed
+        registry.inc_many([
+            ("db_statements_total", labels, 1),
+            ("db_statement_seconds_total", labels, elapsed),
+        ])
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_started"):
+            conn.info["metrics_started"].pop()
+
+    pool = engine.pool
+
+    @event.listens_for(pool, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        registry.inc("db_pool_checkouts_total", labels)
+
+    @event.listens_for(pool, "connect")
+    def connect(dbapi_connection, connection_record):
+        registry.inc("db_pool_connections_total", labels)
+
+    def pool_stats() -> list:
+        # QueuePool以外（SQLiteのSingletonThreadPoolなど）は値を持たないものがある
+        samples = []
+        for metric, attribute in (
+            ("db_pool_size", "size"),
+            ("db_pool_checked_out", "checkedout"),
+            ("db_pool_checked_in", "checkedin"),
+            ("db_pool_overflow", "overflow"),
+        ):
+            method = getattr(pool, attribute, None)
+            if callable(method):
+                samples.append((metric, labels, method()))
+        return samples
+
+    registry.add_collector(pool_stats)
+
+# ===========================================
+# ミドルウェア
+# ===========================================
+
+class MetricsMiddleware:
+    """リクエストごとの処理時間・レスポンスサイズ・SQLの実行回数と時間を記録するASGIミドルウェア
+
+    ルーティング後のscope["endpoint"]からルートのテンプレートを求める（アプリのルートから一度だけ作成）。
+    ストリーミングのレスポンスは最後の本体を送り終えた時点までを処理時間とする。
+    """
+
+    def __init__(self, app, routes_source=None):
+        self.app = app
+        self.routes_source = routes_source
+        self._route_names = None
+
+    def _route_name(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_names is None:
+            routes = self.routes_source.routes if self.routes_source is not None else []
+            self._route_names = {
+                route.endpoint: route.path for route in routes if hasattr(route, "endpoint")
+            }
+        return self._route_names.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = _RequestStats()
+        token = _request_stats.set(stats)
+        state = {"status": 500, "size": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            elapsed = time.perf_counter() - started
+            route = self._route_name(scope)
+            labels = (("method", scope["method"]), ("route", route))
+            registry.inc("http_requests_total", labels + (("status", str(state["status"])),))
+            registry.observe_many([
+                ("http_request_duration_seconds", labels, LATENCY_BUCKETS, elapsed),
+                ("http_response_size_bytes", labels, SIZE_BUCKETS, state["size"]),
+                ("http_request_db_statements", labels, STATEMENT_BUCKETS, stats.statements),
+                ("http_request_db_seconds", labels, LATENCY_BUCKETS, stats.seconds),
+            ])
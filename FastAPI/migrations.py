@@ -0,0 +1,134 @@
+# migrations.py
+"""バージョン管理付きのデータベースマイグレーション
+
+適用済みのバージョンは schema_migrations テーブルに記録され、
+未適用のものだけが番号順に実行されます。既存の本番テーブルに対しても
+ダンプ・リストアなしでインデックス等を追加できます。
+
+各マイグレーションは、すでに同じ変更が存在する場合（新規DBで
+create_all 済みの場合など）でも安全に実行できるように書いてください。
+"""
+import logging
+from sqlalchemy import Table, Column, Integer, String, DateTime, MetaData, inspect, select, func
+from main import Base, engine, UserModel, ShiftRequestModel, ConfirmedShiftModel, ChangeLogModel, Settings, DOW_VERSION_KEY, CHANGE_LOG_PRUNED_KEY
+
+logger = logging.getLogger("shift.migrations")
+
+# 適用済みバージョンの記録用テーブル
+migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime, default=func.now()),
+)
+
+# (バージョン, 説明, 実行関数) のリスト
+MIGRATIONS = []
+
+def migration(version: int, description: str):
+    """マイグレーション関数を登録するデコレータ"""
+    def decorator(apply):
+        MIGRATIONS.append((version, description, apply))
+        return apply
+    return decorator
+
+def create_missing_indexes(conn, table: Table, index_names: list):
+    """指定された名前のインデックスのうち、まだ存在しないものを作成"""
+    existing = {ix["name"] for ix in inspect(conn).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name in index_names and index.name not in existing:
+            if index.unique:
+                check_no_duplicates(conn, table, [c.name for c in index.columns])
+            index.create(bind=conn)
+            logger.info("インデックスを作成しました: %s.%s", table.name, index.name)
+
+def check_no_duplicates(conn, table: Table, column_names: list):
+    """ユニークインデックス作成前に重複行がないことを確認"""
+    columns = [table.c[name] for name in column_names]
+    duplicates = conn.execute(
+        select(*columns, func.count().label("cnt"))
+        .group_by(*columns)
+        .having(func.count() > 1)
+    ).all()
+    if duplicates:
+        sample = ", ".join(str(tuple(row[:-1])) for row in duplicates[:10])
+        raise RuntimeError(
+            f"{table.name} に ({', '.join(column_names)}) の重複が {len(duplicates)} 件あります。"
+            f"重複を解消してから再実行してください。例: {sample}"
+        )
+
+# ===========================================
+# マイグレーション定義
+# ===========================================
+
+@migration(1, "初期テーブル作成")
+def create_initial_tables(conn):
+    Base.metadata.create_all(
+        bind=conn,
+        tables=[
+            UserModel.__table__,
+            ShiftRequestModel.__table__,
+            ConfirmedShiftModel.__table__,
+            Settings.__table__,
+        ],
+    )
+
+@migration(2, "シフトテーブルに (user_id, date) / (date, user_id) 複合インデックスを追加")
+def add_shift_composite_indexes(conn):
+    create_missing_indexes(
+        conn,
+        ShiftRequestModel.__table__,
+        ["uq_shift_requests_user_date", "ix_shift_requests_date_user"],
+    )
+    create_missing_indexes(
+        conn,
+        ConfirmedShiftModel.__table__,
+        ["uq_confirmed_shifts_user_date", "ix_confirmed_shifts_date_user"],
+    )
+
+@migration(3, "差分取得API用の変更履歴テーブル change_log を追加")
+def create_change_log_table(conn):
+    Base.metadata.create_all(bind=conn, tables=[ChangeLogModel.__table__])
+
+@migration(4, "授業曜日設定のバージョンの行を作成（更新時にSQLで1増やすため）")
+def create_dow_version_setting(conn):
+    settings = Settings.__table__
+    exists = conn.execute(select(settings.c.id).where(settings.c.key == DOW_VERSION_KEY)).first()
+    if exists is None:
+        conn.execute(settings.insert().values(key=DOW_VERSION_KEY, value="0"))
+
+@migration(5, "change_log に (date, id) / changed_at のインデックスと、削除済みの位置の設定を追加")
+def add_change_log_retention(conn):
+    create_missing_indexes(conn, ChangeLogModel.__table__, ["ix_change_log_date_id", "ix_change_log_changed_at"])
+    settings = Settings.__table__
+    exists = conn.execute(select(settings.c.id).where(settings.c.key == CHANGE_LOG_PRUNED_KEY)).first()
+    if exists is None:
+        conn.execute(settings.insert().values(key=CHANGE_LOG_PRUNED_KEY, value="0"))
+
+# ===========================================
+# 実行
+# ===========================================
+
+def get_applied_versions(conn) -> set:
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def run_migrations(bind=engine):
+    """未適用のマイグレーションを番号順に実行"""
+    migration_metadata.create_all(bind=bind)
+
+    with bind.connect() as conn:
+        applied = get_applied_versions(conn)
+
+    for version, description, apply in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+        logger.info("マイグレーション %d を適用中: %s", version, description)
+        with bind.begin() as conn:
+            apply(conn)
+            conn.execute(schema_migrations.insert().values(version=version, description=description))
+
+if __name__ == "__main__":
+    run_migrations(engine)
+    logger.info("データベースマイグレーションが完了しました。")
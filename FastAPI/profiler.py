@@ -0,0 +1,215 @@
+# profiler.py
+"""遅いSQLの検出（EXPLAINの取得・フィンガープリントごとの集計）
+
+SlowQueryProfiler.install(engine) でエンジンにSQLの計測を追加し（非同期エンジンは sync_engine を渡し、
+EXPLAINには同じDBの同期エンジンを explain_engine で指定する）、閾値を超えたSQLを
+フィンガープリント（定数・プレースホルダーを ? にまとめ、IN (...) の個数を無視した正規化後のSQL）ごとに集計します。
+
+    - 実行回数・合計/最大時間・呼び出し元のエンドポイント
+    - リクエストの処理中に最初に検出したとき（以後は explain_interval 秒ごと）に別の接続でEXPLAINを実行した結果
+      （MySQLは EXPLAIN、SQLiteは EXPLAIN QUERY PLAN）と、フルスキャンを含むかどうか
+
+集計は件数の上限付きで、上限を超えると最も長く検出されていないフィンガープリントから削除します。
+EXPLAINは専用のスレッド1つで実行し、リクエストの処理を待たせません（実行待ちが多い場合は省略）。
+値はワーカー（プロセス）ごとに集計されます。
+"""
+import contextvars
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger("shift.profiler")
+
+# EXPLAINの対象（INSERT ... VALUES などは対象外）
+_EXPLAINABLE = re.compile(r"^\s*(select|update|delete)\b", re.IGNORECASE)
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bvalues\s*\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(statement: str) -> str:
+    """定数・プレースホルダーを ? に、IN (?, ?, ...) を IN (...) にまとめたSQL"""
+    normalized = _STRING.sub("?", statement)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _VALUES_LIST.sub("VALUES (...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+# 処理中のリクエストのASGIのscope（呼び出し元のエンドポイントの記録用）
+_current_scope = contextvars.ContextVar("profiler_scope", default=None)
+
+class ProfilerMiddleware:
+    """遅いSQLの呼び出し元を記録するため、処理中のリクエストを保持するASGIミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
+
+def _current_endpoint() -> str:
+    scope = _current_scope.get()
+    if scope is None:
+        return "(リクエスト外)"
+    # パスはidを含むため、関数名がわかればそちらで集計する
+    name = getattr(scope.get("endpoint"), "__name__", None)
+    return f"{scope['method']} {name or scope['path']}"
+
+def _is_full_scan(dialect: str, plan: list) -> bool:
+    if dialect == "mysql":
+        return any(str(row.get("type", "")).upper() == "ALL" for row in plan)
+    if dialect == "sqlite":
+        # "SCAN table"（インデックスを使わない走査）。"SCAN table USING (COVERING) INDEX" は除く
+        return any(
+            str(row.get("detail", "")).startswith("SCAN ") and "USING" not in str(row.get("detail", ""))
+            for row in plan
+        )
+    return False
+
+def _jsonable(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+class SlowQueryProfiler:
+    """閾値を超えたSQLをフィンガープリントごとに集計する"""
+
+    def __init__(self, threshold_ms: float = 100, max_entries: int = 100,
+                 explain_interval: float = 600, max_pending_explains: int = 10, max_endpoints: int = 10):
+        self.threshold = threshold_ms / 1000
+        self.max_entries = max_entries
+        self.explain_interval = explain_interval
+        self.max_pending_explains = max_pending_explains
+        self.max_endpoints = max_endpoints
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        self._pending_explains = 0
+        self._explaining = threading.local()
+
+    def install(self, engine, explain_engine=None):
+        """エンジンにSQLの計測を追加（EXPLAINはexplain_engine、省略時はengineの別の接続で実行）"""
+        from sqlalchemy import event
+
+        explain_engine = explain_engine or engine
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["profiler_started"].pop()
+            if elapsed >= self.threshold and not getattr(self._explaining, "active", False):
+                self.record(explain_engine, statement, None if executemany else parameters, elapsed)
+
+        @event.listens_for(engine, "handle_error")
+        def handle_error(exception_context):
+            conn = exception_context.connection
+            if conn is not None and conn.info.get("profiler_started"):
+                conn.info["profiler_started"].pop()
+
+    def record(self, engine, statement: str, parameters, elapsed: float):
+        normalized = normalize_sql(statement)
+        key = fingerprint(normalized)
+        endpoint = _current_endpoint()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    "fingerprint": key,
+                    "sql": normalized,
+                    "sample": statement,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "endpoints": {},
+                    "explain": None,
+                    "full_scan": None,
+                    "explained_at": None,
+                    "first_seen": datetime.utcnow(),
+                    "last_seen": None,
+                }
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(key)
+            entry["count"] += 1
+            entry["total_ms"] += elapsed * 1000
+            entry["max_ms"] = max(entry["max_ms"], elapsed * 1000)
+            entry["last_seen"] = datetime.utcnow()
+            endpoints = entry["endpoints"]
+            if endpoint in endpoints or len(endpoints) < self.max_endpoints:
+                endpoints[endpoint] = endpoints.get(endpoint, 0) + 1
+
+            # リクエスト外（起動時のマイグレーションなど）ではEXPLAINを実行しない。
+            # SQLiteではDDLの途中で別の接続を使うと、スキーマの変更が見えなくなることがある
+            explain = (
+                _current_scope.get() is not None
+                and _EXPLAINABLE.match(statement) is not None
+                and (entry["explained_at"] is None or now - entry["explained_at"] >= self.explain_interval)
+                and self._pending_explains < self.max_pending_explains
+            )
+            if explain:
+                entry["explained_at"] = now
+                entry["sample"] = statement
+                self._pending_explains += 1
+        logger.warning("遅いSQLを検出しました: %.1f ms %s [%s]", elapsed * 1000, key, endpoint)
+        if explain:
+            self._explain_executor.submit(self._explain, engine, key, statement, parameters)
+
+    def _explain(self, engine, key: str, statement: str, parameters):
+        dialect = engine.dialect.name
+        prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+        self._explaining.active = True
+        try:
+            with engine.connect() as conn:
+                result = conn.exec_driver_sql(prefix + statement, parameters if parameters is not None else ())
+                plan = [{column: _jsonable(value) for column, value in row._mapping.items()} for row in result]
+                conn.rollback()
+        except Exception as e:
+            logger.warning("EXPLAINを取得できませんでした: %s (%s)", key, e)
+            plan = None
+        finally:
+            self._explaining.active = False
+        with self._lock:
+            self._pending_explains -= 1
+            entry = self._entries.get(key)
+            if entry is not None and plan is not None:
+                entry["explain"] = plan
+                entry["full_scan"] = _is_full_scan(dialect, plan)
+
+    def snapshot(self) -> list:
+        """集計結果（合計時間の長い順）"""
+        with self._lock:
+            entries = [
+                dict(entry, endpoints=dict(entry["endpoints"]), total_ms=round(entry["total_ms"], 3), max_ms=round(entry["max_ms"], 3))
+                for entry in self._entries.values()
+            ]
+        for entry in entries:
+            del entry["explained_at"]
+        return sorted(entries, key=lambda entry: entry["total_ms"], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,29 @@
+# prune_change_log.py
+"""保存期間（CHANGE_LOG_RETENTION_DAYS）を過ぎた変更履歴（change_log）の削除
+
+cronなどで1日1回程度実行してください。削除した位置より前のsinceを指定した差分取得は410になり、
+クライアントは一覧を取得し直します。
+
+使い方:
+    python prune_change_log.py
+    python prune_change_log.py --retention-days 7
+"""
+import argparse
+import logging
+
+from main import SessionLocal, CHANGE_LOG_RETENTION_DAYS, prune_change_log
+
+logger = logging.getLogger("shift.prune_change_log")
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--retention-days", type=int, default=CHANGE_LOG_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=10000, help="1回のDELETE・コミットで削除する件数")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        deleted = prune_change_log(db, args.retention_days, args.batch_size)
+    logger.info("変更履歴を %d 件削除しました（%d日より前）。", deleted, args.retention_days)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,176 @@
+# pubsub.py
+"""変更通知のpub/sub（SSEでの配信用）
+
+書き込みがコミットされると、変更の一覧（JSON: {"changes": [{entity, operation, id, user_id, date}, ...]}）を
+publishします。購読者（SSEの接続）ごとに条件（predicate）で絞り込み、asyncio.Queueに入れます。
+
+    local   プロセス内だけで配信（ワーカー1つの場合やテスト用）
+    socket  キャッシュサーバー（python cache.py）を中継して全ワーカーに配信。
+            各ワーカーはサーバーへの購読用の接続を1本だけ持ち、受け取った変更をプロセス内で配る
+
+購読者の処理が追いつかずキューがあふれた場合や、キャッシュサーバーとの接続が切れて
+変更を取りこぼした可能性がある場合は、購読者にRESYNCを渡します（クライアントは差分取得APIで再取得する）。
+"""
+import asyncio
+import json
+import logging
+import socket
+import threading
+
+from cache import SocketBackend, parse_address, send_message, recv_message
+
+logger = logging.getLogger("shift.pubsub")
+
+# 変更を取りこぼした可能性があることを表す値（クライアントに再取得させる）
+RESYNC = object()
+
+CHANNEL = "changes"
+
+class Subscription:
+    """購読（1つのSSE接続）。get()で変更のリスト（またはRESYNC）を待つ"""
+
+    def __init__(self, hub: "PubSub", predicate, max_queue: int):
+        self.hub = hub
+        self.predicate = predicate
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_queue)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+    def _put(self, item):
+        # イベントループのスレッドで実行される
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            item = RESYNC
+        self.queue.put_nowait(item)
+
+    def _put_threadsafe(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:
+            # イベントループが終了している
+            self.close()
+
+class PubSub:
+    """プロセス内のpub/sub"""
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, predicate) -> Subscription:
+        """購読を開始（イベントループ内で呼び出す）。predicate(変更)がTrueの変更だけを受け取る"""
+        subscription = Subscription(self, predicate, self.max_queue)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def publish(self, message: bytes):
+        self._deliver(message)
+
+    def close(self):
+        pass
+
+    def _targets(self) -> list:
+        with self._lock:
+            return list(self._subscriptions)
+
+    def _deliver(self, message: bytes):
+        targets = self._targets()
+        if not targets:
+            return
+        changes = json.loads(message)["changes"]
+        for subscription in targets:
+            matched = [change for change in changes if subscription.predicate(change)]
+            if matched:
+                subscription._put_threadsafe(matched)
+
+    def _resync_all(self):
+        for subscription in self._targets():
+            subscription._put_threadsafe(RESYNC)
+
+class SocketPubSub(PubSub):
+    """キャッシュサーバーを中継して全ワーカーに配信するpub/sub
+
+    購読用の接続は最初の購読時に開始し、切断された場合は再接続して全購読者にRESYNCを渡す。
+    キャッシュサーバーにpublishできない場合はこのワーカー内だけに配信する。
+    """
+
+    def __init__(self, address: str, max_queue: int = 100, reconnect_seconds: float = 1.0):
+        super().__init__(max_queue)
+        self.family, self.address = parse_address(address)
+        self.reconnect_seconds = reconnect_seconds
+        self._publisher = SocketBackend(address)
+        self._listener = None
+        self._sock = None
+        self._closed = threading.Event()
+
+    def subscribe(self, predicate) -> Subscription:
+        subscription = super().subscribe(predicate)
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="pubsub-listener", daemon=True)
+                self._listener.start()
+        return subscription
+
+    def publish(self, message: bytes):
+        if not self._publisher.publish(CHANNEL, message):
+            self._deliver(message)
+
+    def close(self):
+        self._closed.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _listen(self):
+        connected_before = False
+        while not self._closed.is_set():
+            sock = socket.socket(self.family, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.address)
+                send_message(sock, {"op": "subscribe", "channels": [CHANNEL]})
+                recv_message(sock)
+                self._sock = sock
+                if connected_before:
+                    # 切断中の変更を取りこぼした可能性がある
+                    self._resync_all()
+                connected_before = True
+                logger.info("変更通知の購読を開始しました")
+                while True:
+                    _, blobs = recv_message(sock)
+                    self._deliver(blobs[0])
+            except (OSError, ValueError) as e:
+                if not self._closed.is_set():
+                    logger.warning("変更通知の購読が切断されました: %s", e)
+            finally:
+                self._sock = None
+                sock.close()
+            self._closed.wait(self.reconnect_seconds)
+
+def create_pubsub(kind: str, address: str = None, max_queue: int = 100) -> PubSub:
+    """設定（PUBSUB_BACKEND / CACHE_SOCKET）からpub/subを作成"""
+    if kind == "local":
+        return PubSub(max_queue)
+    if kind == "socket":
+        if not address:
+            raise ValueError("PUBSUB_BACKEND=socket の場合は CACHE_SOCKET を指定してください。")
+        return SocketPubSub(address, max_queue)
+    raise ValueError(f"不明なpub/subバックエンドです: {kind}")
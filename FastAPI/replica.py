@@ -0,0 +1,57 @@
+# replica.py
+"""読み取りレプリカへの振り分け（read-your-writes）
+
+一覧取得APIはレプリカから読みますが、レプリカは書き込みの反映が遅れることがあります。
+書き込んだ本人には直後の一覧に自分の変更が見えるよう、書き込みをコミットしたユーザーを
+一定時間（window_seconds）記録し、その間はそのユーザーの読み取りをプライマリに送ります。
+
+記録はキャッシュ（CacheBackend）に有効期限付きで保存するため、別のワーカーで書き込んだ場合も同じ結果になります。
+コミットしたユーザーは、リクエストごとの辞書（RequestUserMiddlewareで作成し、認証時に set_request_user で設定）から求めます。
+"""
+import contextvars
+
+# 処理中のリクエストの認証済みユーザー。辞書ごと引き継がれるため、スレッドプールで実行される
+# 依存関係（認証）で設定した値を、別のスレッドで実行されるエンドポイントのコミット時に参照できる
+_request_user = contextvars.ContextVar("request_user", default=None)
+
+class RequestUserMiddleware:
+    """リクエストごとに認証済みユーザーを記録する辞書を用意するASGIミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_user.set({})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_user.reset(token)
+
+def set_request_user(user_id: int):
+    holder = _request_user.get()
+    if holder is not None:
+        holder["user_id"] = user_id
+
+def request_user():
+    holder = _request_user.get()
+    return None if holder is None else holder.get("user_id")
+
+class ReadYourWrites:
+    """直前に書き込んだユーザーの記録"""
+
+    def __init__(self, backend, window_seconds: float):
+        self.backend = backend
+        self.window_seconds = window_seconds
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"recent_write:user:{user_id}"
+
+    def mark(self, user_id: int):
+        self.backend.set(self._key(user_id), b"1", self.window_seconds)
+
+    def recently_wrote(self, user_id: int) -> bool:
+        return self.backend.get(self._key(user_id)) is not None
@@ -1,10 +1,14 @@
+import logging
 import uvicorn
-from main import app, Base, engine
+from main import app, engine
+from migrations import run_migrations
+
+logger = logging.getLogger("shift.run")
 
 if __name__ == "__main__":
-    # データベーステーブル作成
-    Base.metadata.create_all(bind=engine)
-    print("データベーステーブルが作成されました。")
+    # データベースマイグレーション（テーブル作成・インデックス追加）
+    run_migrations(engine)
+    logger.info("データベースマイグレーションが完了しました。")
     
     # FastAPIアプリケーション起動
     uvicorn.run(
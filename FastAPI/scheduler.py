@@ -0,0 +1,138 @@
+# scheduler.py
+"""シフト希望からの確定シフトの自動割り当て
+
+ユーザーと日付の二部グラフ上の最大流問題として解きます。
+
+    始点 → ユーザー   容量: 1人あたりの上限 − その月の既存の確定シフト数
+    ユーザー → 日付   容量: 1（その日に勤務可能なシフト希望がある場合）
+    日付 → 終点       容量: その日の必要人数 − 既存の確定シフト数
+
+まず上限なしで最大の割り当て数を求め、その割り当て数を保ったまま
+1人あたりの上限を二分探索で最小にします（負担が特定の人に偏らないようにする）。
+最大流はDinic法で計算します（ユーザー数×日数が数千〜1万程度で1回数十ミリ秒）。
+"""
+from collections import deque
+
+class MaxFlow:
+    """Dinic法による最大流"""
+
+    def __init__(self, node_count: int):
+        self.graph = [[] for _ in range(node_count)]
+        # 辺ごとの (行き先, 残り容量)。逆辺は index ^ 1
+        self.to = []
+        self.capacity = []
+
+    def add_edge(self, u: int, v: int, capacity: int) -> int:
+        """辺を追加してその番号を返す（flow_on で流量を確認できる）"""
+        index = len(self.to)
+        self.graph[u].append(index)
+        self.to.append(v)
+        self.capacity.append(capacity)
+        self.graph[v].append(index + 1)
+        self.to.append(u)
+        self.capacity.append(0)
+        return index
+
+    def flow_on(self, edge: int) -> int:
+        return self.capacity[edge ^ 1]
+
+    def max_flow(self, source: int, sink: int) -> int:
+        total = 0
+        while True:
+            level = self._levels(source, sink)
+            if level[sink] < 0:
+                return total
+            progress = [0] * len(self.graph)
+            while True:
+                pushed = self._push(source, sink, float("inf"), level, progress)
+                if not pushed:
+                    break
+                total += pushed
+
+    def _levels(self, source: int, sink: int) -> list:
+        level = [-1] * len(self.graph)
+        level[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            for edge in self.graph[u]:
+                v = self.to[edge]
+                if self.capacity[edge] > 0 and level[v] < 0:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+        return level
+
+    def _push(self, u: int, sink: int, limit, level: list, progress: list) -> int:
+        if u == sink:
+            return limit
+        edges = self.graph[u]
+        while progress[u] < len(edges):
+            edge = edges[progress[u]]
+            v = self.to[edge]
+            if self.capacity[edge] > 0 and level[v] == level[u] + 1:
+                pushed = self._push(v, sink, min(limit, self.capacity[edge]), level, progress)
+                if pushed:
+                    self.capacity[edge] -= pushed
+                    self.capacity[edge ^ 1] += pushed
+                    return pushed
+            progress[u] += 1
+        return 0
+
+def _solve_with_limit(candidates: dict, targets: dict, existing_load: dict, users: list, limit: int) -> tuple:
+    """1人あたりの上限をlimitとしたときの (割り当て数, {日付: [ユーザーID]})"""
+    days = sorted(targets)
+    user_index = {user_id: 1 + i for i, user_id in enumerate(users)}
+    day_index = {day: 1 + len(users) + i for i, day in enumerate(days)}
+    source, sink = 0, 1 + len(users) + len(days)
+
+    flow = MaxFlow(sink + 1)
+    for user_id in users:
+        capacity = limit - existing_load.get(user_id, 0)
+        if capacity > 0:
+            flow.add_edge(source, user_index[user_id], capacity)
+    assignment_edges = []
+    for day in days:
+        if targets[day] <= 0:
+            continue
+        flow.add_edge(day_index[day], sink, targets[day])
+        for user_id in candidates.get(day, ()):
+            assignment_edges.append((day, user_id, flow.add_edge(user_index[user_id], day_index[day], 1)))
+
+    total = flow.max_flow(source, sink)
+    assignments = {}
+    for day, user_id, edge in assignment_edges:
+        if flow.flow_on(edge):
+            assignments.setdefault(day, []).append(user_id)
+    return total, assignments
+
+def assign_shifts(candidates: dict, targets: dict, existing_load: dict = None, max_load: int = None) -> tuple:
+    """シフト希望から割り当てを計算
+
+    candidates:    {日付: [勤務可能なユーザーID]}（既に確定シフトがあるユーザーは除いておく）
+    targets:       {日付: 追加で必要な人数}
+    existing_load: {ユーザーID: その月の既存の確定シフト数}
+    max_load:      1人あたりの確定シフト数の上限（既存分を含む、Noneなら制限なし）
+
+    (割り当て {日付: [ユーザーID]}, 1人あたりの上限) を返す。割り当て数は最大で、
+    その中で1人あたりの確定シフト数の最大値が最小になるものを選ぶ。
+    """
+    existing_load = existing_load or {}
+    users = sorted({user_id for day_users in candidates.values() for user_id in day_users})
+    if not users:
+        return {}, 0
+
+    upper = max(existing_load.get(user_id, 0) for user_id in users) + len(targets)
+    if max_load is not None:
+        upper = min(upper, max_load)
+    best_total, best = _solve_with_limit(candidates, targets, existing_load, users, upper)
+
+    # 割り当て数を減らさずに済む最小の上限を二分探索
+    low, high = 0, upper
+    while low < high:
+        middle = (low + high) // 2
+        total, assignments = _solve_with_limit(candidates, targets, existing_load, users, middle)
+        if total == best_total:
+            high, best = middle, assignments
+        else:
+            low = middle + 1
+    return best, high
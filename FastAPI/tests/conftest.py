@@ -0,0 +1,83 @@
+# tests/conftest.py
+"""テスト共通の設定
+
+main をインポートする前に、一時ディレクトリのSQLiteとプロセス内のキャッシュ・pub/subを使う設定にします
+（コンテナの DATABASE_URL などが設定されていても上書きする）。
+データベースはテスト全体で共有するため、各テストは make_user で作成した別々のユーザーと、
+テストごとに異なる年月のデータを使ってください。
+"""
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+FASTAPI_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, FASTAPI_DIR)
+
+_tmp = tempfile.mkdtemp(prefix="shift-test-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_tmp}/test.db",
+    READ_DATABASE_URL="",
+    DB_ASYNC="false",
+    CACHE_BACKEND="memory",
+    PUBSUB_BACKEND="local",
+    SECRET_KEY="test-secret",
+    ADMIN_CODE="test-admin",
+    BCRYPT_ROUNDS="4",
+    SLOW_QUERY_ENABLED="false",
+    LOG_LEVEL="WARNING",
+)
+
+import main  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from migrations import run_migrations  # noqa: E402
+
+PASSWORD = "test-pass"
+
+@pytest.fixture(scope="session")
+def client():
+    run_migrations(main.engine)
+    with TestClient(main.app) as c:
+        yield c
+
+_user_numbers = itertools.count()
+
+@pytest.fixture
+def make_user(client):
+    """ユーザーを登録してログインし、(id, 認証ヘッダー) を返す関数"""
+    def make(admin: bool = False):
+        username = f"t{next(_user_numbers)}"
+        body = {"username": username, "DisplayName": username, "password": PASSWORD}
+        if admin:
+            body["admin_code"] = os.environ["ADMIN_CODE"]
+        r = client.post("/api/v1/auth/register", json=body)
+        assert r.status_code == 201, r.text
+        r = client.post("/api/v1/auth/login", data={"username": username, "password": PASSWORD})
+        assert r.status_code == 200, r.text
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        return client.get("/api/v1/auth/me", headers=headers).json()["id"], headers
+    return make
+
+@pytest.fixture
+def admin(make_user, client):
+    """管理者の認証ヘッダー（全曜日を授業日にしておく）"""
+    _, headers = make_user(admin=True)
+    all_days = {d: True for d in ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]}
+    assert client.put("/api/v1/admin/settings/dow", json=all_days, headers=headers).status_code == 200
+    return headers
+
+@pytest.fixture
+def statements():
+    """実行されたSQLの一覧（before_cursor_executeで記録）"""
+    from sqlalchemy import event
+
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(main.engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(main.engine, "before_cursor_execute", record)
@@ -0,0 +1,48 @@
+# tests/test_applog.py
+"""キュー経由のログ出力（引数は呼び出し時点の内容で出力する）"""
+import json
+import logging
+import queue
+
+from applog import JsonFormatter, NonBlockingQueueHandler
+
+def make_logger(name: str, size: int = 10):
+    handler = NonBlockingQueueHandler(queue.Queue(size))
+    logger = logging.getLogger(f"shift.test.{name}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger, handler.queue
+
+def test_args_rendered_when_logged():
+    logger, records = make_logger("args")
+    row = {"status": "before"}
+    items = [1]
+    logger.info("row=%s items=%s", row, items)
+    row["status"] = "after"
+    items.append(2)
+
+    record = records.get_nowait()
+    assert record.args is None
+    assert record.getMessage() == "row={'status': 'before'} items=[1]"
+    assert json.loads(JsonFormatter().format(record))["message"] == "row={'status': 'before'} items=[1]"
+
+def test_exception_formatted_when_logged():
+    logger, records = make_logger("exc")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+
+    record = records.get_nowait()
+    assert record.exc_info is None
+    assert "ValueError: boom" in json.loads(JsonFormatter().format(record))["exc_info"]
+    assert "ValueError: boom" in logging.Formatter().format(record)
+
+def test_full_queue_drops_records():
+    logger, records = make_logger("full", size=1)
+    dropped = NonBlockingQueueHandler.dropped
+    logger.info("first")
+    logger.info("second")
+    assert records.qsize() == 1
+    assert NonBlockingQueueHandler.dropped == dropped + 1
@@ -0,0 +1,93 @@
+# tests/test_auth.py
+"""削除したユーザーの発行済みトークンの拒否"""
+import math
+
+import pytest
+
+import main
+from cache import CacheUnavailableError, MemoryBackend, SocketBackend
+
+class UnavailableBackend(MemoryBackend):
+    """キャッシュサーバーに接続できない状態"""
+
+    def set_persistent(self, key, value, ttl_seconds):
+        raise CacheUnavailableError("down")
+
+    def get_persistent(self, key):
+        raise CacheUnavailableError("down")
+
+def delete(client, admin, user_id):
+    return client.delete(f"/api/v1/admin/users/{user_id}", headers=admin)
+
+def test_persistent_values_survive_lru_eviction():
+    backend = MemoryBackend(max_entries=2)
+    backend.set_persistent("user:1", b"", 60)
+    for n in range(10):
+        backend.set(f"key:{n}", b"x")
+    assert backend.get_persistent("user:1") == (b"", backend.started_at)
+
+def test_persistent_values_expire():
+    backend = MemoryBackend()
+    backend.set_persistent("user:1", b"", 0)
+    assert backend.get_persistent("user:1") == (None, backend.started_at)
+
+def test_socket_backend_raises_when_unavailable(tmp_path):
+    backend = SocketBackend(str(tmp_path / "missing.sock"), timeout=0.1)
+    assert backend.get_many(["a"]) == [None]
+    with pytest.raises(CacheUnavailableError):
+        backend.get_persistent("user:1")
+    with pytest.raises(CacheUnavailableError):
+        backend.set_persistent("user:1", b"", 60)
+
+def test_deleted_user_rejected_after_eviction(client, admin, make_user, monkeypatch):
+    monkeypatch.setattr(main, "cache_backend", MemoryBackend(max_entries=2))
+    user_id, headers = make_user()
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+    assert delete(client, admin, user_id).status_code == 200
+    for n in range(10):
+        main.cache_backend.set(f"key:{n}", b"x")
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+
+def test_deleted_user_rejected_after_cache_restart(client, admin, make_user, monkeypatch):
+    user_id, headers = make_user()
+    assert delete(client, admin, user_id).status_code == 200
+    # 再起動で記録が失われても、再起動より前に発行されたトークンはDBで確認される
+    restarted = MemoryBackend()
+    restarted.started_at = math.floor(restarted.started_at) + 1
+    monkeypatch.setattr(main, "cache_backend", restarted)
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 401
+
+def test_cache_unavailable_falls_back_to_db(client, admin, make_user, monkeypatch):
+    user_id, headers = make_user()
+    deleted_id, deleted_headers = make_user()
+    assert delete(client, admin, deleted_id).status_code == 200
+    monkeypatch.setattr(main, "cache_backend", UnavailableBackend())
+    r = client.get("/api/v1/auth/me", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["id"] == user_id
+    assert client.get("/api/v1/auth/me", headers=deleted_headers).status_code == 401
+
+def test_delete_refused_when_cache_unavailable(client, admin, make_user, monkeypatch):
+    user_id, headers = make_user()
+    monkeypatch.setattr(main, "cache_backend", UnavailableBackend())
+    assert delete(client, admin, user_id).status_code == 503
+    monkeypatch.undo()
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == 200
+
+def test_token_claims_used_without_db(make_user, statements, monkeypatch):
+    _, headers = make_user()
+    # 発行時刻によらず、キャッシュの起動より後に発行されたトークンにする
+    backend = MemoryBackend()
+    backend.started_at = 0.0
+    monkeypatch.setattr(main, "cache_backend", backend)
+    statements.clear()
+    user = main.authenticate_token(headers["Authorization"].split()[1])
+    assert user.username.startswith("t")
+    assert statements == []
+
+def test_token_issued_in_cache_start_second_is_trusted(monkeypatch):
+    backend = MemoryBackend()
+    backend.started_at = 1000.75
+    monkeypatch.setattr(main, "cache_backend", backend)
+    assert main.token_claims_trusted(1, 1000)
+    assert not main.token_claims_trusted(1, 999)
@@ -0,0 +1,112 @@
+# tests/test_changes.py
+"""差分取得API（watermark・表示対象・削除の扱い）と変更履歴の削除"""
+from datetime import datetime, timedelta, date
+
+import pytest
+from sqlalchemy import func, inspect, select
+
+import main
+
+MONTH = {"year": 2032, "month": 3}
+
+@pytest.fixture
+def settled(monkeypatch):
+    """待ち時間なし（すべての変更を確定済みとして扱う）"""
+    monkeypatch.setattr(main, "CHANGES_SETTLE_SECONDS", 0)
+
+def changes(client, headers, since=None, **params) -> dict:
+    if since is not None:
+        params["since"] = since
+    r = client.get("/api/v1/changes", params=params, headers=headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+def add_shift(client, admin, user_id: int, day: str) -> int:
+    r = client.post("/api/v1/admin/confirmed-shifts", json={
+        "date": day, "start_time": "10:00", "end_time": "15:00", "user_id": user_id
+    }, headers=admin)
+    assert r.status_code == 201, r.text
+    return r.json()["id"]
+
+def test_watermark_waits_for_settle_seconds(client, admin, make_user, monkeypatch, settled):
+    user_id, headers = make_user()
+    since = changes(client, headers)["watermark"]
+    shift_id = add_shift(client, admin, user_id, "2032-03-01")
+
+    # 待ち時間内の変更は返すが、watermarkは進めない（次回も同じ変更が返る）
+    monkeypatch.setattr(main, "CHANGES_SETTLE_SECONDS", 3600)
+    feed = changes(client, headers, since, **MONTH)
+    assert [row["id"] for row in feed["confirmed_shifts"]["upserted"]] == [shift_id]
+    assert feed["watermark"] == since
+    assert changes(client, headers)["watermark"] <= since
+
+    monkeypatch.setattr(main, "CHANGES_SETTLE_SECONDS", 0)
+    feed = changes(client, headers, since, **MONTH)
+    assert feed["watermark"] > since
+    assert changes(client, headers)["watermark"] == feed["watermark"]
+    assert changes(client, headers, feed["watermark"], **MONTH)["confirmed_shifts"]["upserted"] == []
+
+def test_non_admin_sees_own_requests_and_all_shifts(client, admin, make_user, settled):
+    first_id, first = make_user()
+    second_id, second = make_user()
+    since = changes(client, first)["watermark"]
+    for headers in (first, second):
+        r = client.post("/api/v1/shift-requests/", json={"date": "2032-03-02", "canwork": True}, headers=headers)
+        assert r.status_code == 201, r.text
+    add_shift(client, admin, second_id, "2032-03-03")
+
+    feed = changes(client, first, since, **MONTH)
+    assert [row["user_id"] for row in feed["shift_requests"]["upserted"]] == [first_id]
+    assert [row["user_id"] for row in feed["confirmed_shifts"]["upserted"]] == [second_id]
+    feed = changes(client, admin, since, **MONTH)
+    assert sorted(row["user_id"] for row in feed["shift_requests"]["upserted"]) == [first_id, second_id]
+
+def test_moved_and_deleted_rows_are_tombstones(client, admin, make_user, settled):
+    user_id, headers = make_user()
+    shift_id = add_shift(client, admin, user_id, "2032-03-04")
+    r = client.post("/api/v1/shift-requests/", json={"date": "2032-03-04", "canwork": True}, headers=headers)
+    request_id = r.json()["id"]
+    since = changes(client, headers)["watermark"]
+
+    # 確定シフトを翌月に移動し、シフト希望を削除する
+    r = client.put(f"/api/v1/admin/confirmed-shifts/{shift_id}", json={
+        "date": "2032-04-04", "start_time": "10:00", "end_time": "15:00", "user_id": user_id
+    }, headers=admin)
+    assert r.status_code == 200, r.text
+    assert client.delete(f"/api/v1/shift-requests/{request_id}", headers=headers).status_code == 200
+
+    feed = changes(client, headers, since, **MONTH)
+    assert feed["confirmed_shifts"] == {"upserted": [], "deleted": [shift_id]}
+    assert feed["shift_requests"] == {"upserted": [], "deleted": [request_id]}
+    feed = changes(client, headers, since, year=2032, month=4)
+    assert [row["id"] for row in feed["confirmed_shifts"]["upserted"]] == [shift_id]
+
+def test_prune_change_log(client, admin, make_user):
+    assert {"ix_change_log_date_id", "ix_change_log_changed_at"} <= {
+        index["name"] for index in inspect(main.engine).get_indexes("change_log")
+    }
+    user_id, headers = make_user()
+    old = datetime.utcnow() - timedelta(days=main.CHANGE_LOG_RETENTION_DAYS + 1)
+    with main.SessionLocal() as db:
+        previous = main.change_log_pruned_through(db)
+        db.execute(main.ChangeLogModel.__table__.insert(), [
+            {"entity": "confirmed_shift", "row_id": 0, "user_id": user_id, "date": date(2032, 5, 1),
+             "operation": "delete", "changed_at": old}
+            for _ in range(5)
+        ])
+        db.commit()
+        old_ids = db.execute(select(main.ChangeLogModel.id).where(main.ChangeLogModel.changed_at == old)).scalars().all()
+    try:
+        with main.SessionLocal() as db:
+            # 古い行の位置までを削除する（それより前のidの行も含む）
+            assert main.prune_change_log(db, batch_size=2) >= 5
+            assert db.execute(select(func.count()).where(main.ChangeLogModel.id <= max(old_ids))).scalar() == 0
+            assert main.change_log_pruned_through(db) >= max(old_ids)
+            # 2回目は削除するものがない
+            assert main.prune_change_log(db) == 0
+        r = client.get("/api/v1/changes", params={"since": min(old_ids) - 1}, headers=headers)
+        assert r.status_code == 410, r.text
+    finally:
+        with main.SessionLocal() as db:
+            db.query(main.Settings).filter(main.Settings.key == main.CHANGE_LOG_PRUNED_KEY).update({"value": str(previous)})
+            db.commit()
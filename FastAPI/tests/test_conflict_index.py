@@ -0,0 +1,62 @@
+# tests/test_conflict_index.py
+"""確定シフトの重複チェック用インデックスのバージョン（他のワーカーでの変更の検出）"""
+from datetime import date
+
+import main
+from cache import MemoryBackend
+
+class UnavailableBackend(MemoryBackend):
+    """キャッシュサーバーに接続できない状態（SocketBackendと同じく読み込みはNone、incrは0）"""
+
+    def get_many(self, keys):
+        return [None] * len(keys)
+
+    def incr(self, key):
+        return 0
+
+def add_shift_elsewhere(client, admin, user_id, day: str):
+    """他のワーカーでの変更（テスト対象のインデックスのrecordは呼ばれない）"""
+    r = client.post("/api/v1/admin/confirmed-shifts", json={
+        "date": day, "start_time": "10:00", "end_time": "15:00", "user_id": user_id
+    }, headers=admin)
+    assert r.status_code == 201, r.text
+
+def conflicts(index, user_id, day: date) -> list:
+    start, end = main.shift_interval(day, "12:00", "13:00")
+    with main.SessionLocal() as db:
+        return index.find_conflicts(db, [(user_id, start, end, None)])
+
+def test_reloads_when_cache_unavailable(client, admin, make_user):
+    user_id, _ = make_user()
+    index = main.ShiftConflictIndex(UnavailableBackend(), 10)
+    assert conflicts(index, user_id, date(2031, 8, 4)) == []
+    add_shift_elsewhere(client, admin, user_id, "2031-08-04")
+    assert conflicts(index, user_id, date(2031, 8, 4)) == [0]
+
+def test_reloads_after_cache_restart(client, admin, make_user):
+    user_id, _ = make_user()
+    backend = MemoryBackend()
+    index = main.ShiftConflictIndex(backend, 10)
+    version_key = index._version_key(user_id)
+    backend.incr(version_key)
+    assert conflicts(index, user_id, date(2031, 8, 5)) == []
+
+    # 再起動でカウンターが0に戻り、他のワーカーでの変更で同じ値になる
+    restarted = MemoryBackend()
+    restarted.started_at = backend.started_at + 1
+    index.backend = restarted
+    add_shift_elsewhere(client, admin, user_id, "2031-08-05")
+    restarted.incr(version_key)
+    assert conflicts(index, user_id, date(2031, 8, 5)) == [0]
+
+def test_record_updates_cached_index(client, admin, make_user, statements):
+    user_id, _ = make_user()
+    backend = MemoryBackend()
+    index = main.ShiftConflictIndex(backend, 10)
+    backend.incr(index._version_key(user_id))
+    day = date(2031, 8, 6)
+    assert conflicts(index, user_id, day) == []
+    index.record(user_id, added=[main.shift_interval(day, "10:00", "15:00") + (-1,)])
+    statements.clear()
+    assert conflicts(index, user_id, day) == [0]
+    assert statements == []
@@ -0,0 +1,27 @@
+# tests/test_coverage.py
+"""充足状況の集計"""
+from decimal import Decimal
+
+from sqlalchemy import Numeric, cast, func
+
+import main
+
+def test_decimal_minutes_are_serialized(client, admin, make_user, monkeypatch):
+    # MySQLのSUM(TIMESTAMPDIFF(...))と同じくDecimalで返るようにする
+    shift_minutes_expression = main.shift_minutes_expression
+    monkeypatch.setattr(main, "shift_minutes_expression", lambda db: cast(shift_minutes_expression(db), Numeric))
+    user_id, _ = make_user()
+    shifts = [
+        {"date": "2031-07-01", "start_time": "10:00", "end_time": "15:30", "user_id": user_id},
+        {"date": "2031-07-02", "start_time": "22:00", "end_time": "01:00", "user_id": user_id},
+    ]
+    assert client.post("/api/v1/admin/confirmed-shifts/bulk", json=shifts, headers=admin).status_code == 201
+    with main.SessionLocal() as db:
+        assert isinstance(db.query(func.sum(main.shift_minutes_expression(db))).scalar(), Decimal)
+
+    r = client.get("/api/v1/admin/analytics/coverage", params={"year": 2031, "month": 7}, headers=admin)
+    assert r.status_code == 200, r.text
+    report = r.json()
+    assert report["total_hours"] == 8.5
+    assert [day["hours"] for day in report["days"][:2]] == [5.5, 3.0]
+    assert [user["hours"] for user in report["users"] if user["user_id"] == user_id] == [8.5]
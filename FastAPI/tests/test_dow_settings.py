@@ -0,0 +1,35 @@
+# tests/test_dow_settings.py
+"""授業曜日設定のバージョン（他のワーカーでの更新の検出）"""
+import main
+
+ALL_DAYS = main.DayOfWeekSettings(**{day: True for day in main.DayOfWeekSettings.model_fields})
+WEEKDAYS = main.DayOfWeekSettings(monday=True, tuesday=True, wednesday=True, thursday=True, friday=True)
+
+def version(db) -> str:
+    return db.query(main.Settings.value).filter(main.Settings.key == main.DOW_VERSION_KEY).scalar()
+
+def test_other_worker_reloads_after_update(client):
+    # 別のワーカーのキャッシュ（毎回バージョンを確認する）
+    other_worker = main.DowSettingsCache(check_interval=0)
+    try:
+        with main.SessionLocal() as db:
+            main.set_dow_settings(db, ALL_DAYS)
+            assert other_worker.get_mask(db) == 0b1111111
+        with main.SessionLocal() as db:
+            main.set_dow_settings(db, WEEKDAYS)
+        with main.SessionLocal() as db:
+            assert other_worker.get_mask(db) == 0b0011111
+    finally:
+        with main.SessionLocal() as db:
+            main.set_dow_settings(db, ALL_DAYS)
+
+def test_concurrent_updates_bump_version_twice(client):
+    with main.SessionLocal() as first, main.SessionLocal() as second:
+        before = int(version(first))
+        # firstが読み込んだ（セッションに保持している）後にsecondが更新をコミットする
+        loaded = first.query(main.Settings).all()
+        assert loaded
+        main.set_dow_settings(second, ALL_DAYS)
+        main.set_dow_settings(first, ALL_DAYS)
+    with main.SessionLocal() as db:
+        assert int(version(db)) == before + 2
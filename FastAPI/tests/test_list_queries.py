@@ -0,0 +1,46 @@
+# tests/test_list_queries.py
+"""一覧取得APIのSQLの実行回数（件数が増えても1リクエスト1回のまま変わらないこと）"""
+import pytest
+
+LIST_ENDPOINTS = [
+    ("/api/v1/shift-requests/?year=2031&month=3", "user"),
+    ("/api/v1/confirmed-shifts/?year=2031&month=3", "user"),
+    ("/api/v1/confirmed-shifts/all?year=2031&month=3", "user"),
+    ("/api/v1/admin/shift-requests?year=2031&month=3", "admin"),
+    ("/api/v1/admin/confirmed-shifts?year=2031&month=3", "admin"),
+    ("/api/v1/admin/users", "admin"),
+]
+
+def add_shifts(client, admin, user: tuple, days: range):
+    """2031年3月のdaysの日付にシフト希望と確定シフトを登録"""
+    user_id, headers = user
+    dates = [f"2031-03-{day:02d}" for day in days]
+    r = client.post("/api/v1/shift-requests/bulk", json=[{"date": d, "canwork": True} for d in dates], headers=headers)
+    assert r.status_code == 200, r.text
+    shifts = [{"date": d, "start_time": "10:00", "end_time": "15:00", "user_id": user_id} for d in dates]
+    r = client.post("/api/v1/admin/confirmed-shifts/bulk", json=shifts, headers=admin)
+    assert r.status_code == 201, r.text
+
+def count_statements(client, statements, url: str, headers: dict) -> tuple:
+    statements.clear()
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200, r.text
+    return len(statements), len(r.json())
+
+@pytest.mark.parametrize("url, role", LIST_ENDPOINTS)
+def test_list_statement_count_is_constant(client, make_user, admin, statements, url, role):
+    users = [make_user() for _ in range(2)]
+    for user in users:
+        add_shifts(client, admin, user, range(1, 3))
+    headers = admin if role == "admin" else users[0][1]
+    small, small_rows = count_statements(client, statements, url, headers)
+
+    # 自分の分も他のユーザーの分も増やす（確定シフトの登録で月のスナップショットも作り直しになる）
+    add_shifts(client, admin, users[0], range(3, 8))
+    for _ in range(4):
+        user = make_user()
+        add_shifts(client, admin, user, range(1, 6))
+    large, large_rows = count_statements(client, statements, url, headers)
+
+    assert large_rows > small_rows
+    assert small == large == 1
@@ -0,0 +1,28 @@
+# tests/test_metrics.py
+"""/metrics の出力"""
+import asyncio
+import threading
+
+import main
+
+def test_password_hash_queue_depth_gauge(client):
+    assert "password_hash_queue_depth 0\n" in client.get("/metrics").text
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash(password):
+        started.set()
+        release.wait(5)
+        return "hash"
+
+    async def run():
+        task = asyncio.ensure_future(main.run_password_hash_task(slow_hash, "pw"))
+        await asyncio.to_thread(started.wait, 5)
+        rendered = main.metrics_registry.render()
+        release.set()
+        assert await task == "hash"
+        return rendered
+
+    # 計算中は1、終われば0に戻る
+    assert "password_hash_queue_depth 1\n" in asyncio.run(run())
+    assert "password_hash_queue_depth 0\n" in client.get("/metrics").text
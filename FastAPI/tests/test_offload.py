@@ -0,0 +1,25 @@
+# tests/test_offload.py
+"""offload（DB_ASYNC=trueのエンドポイント本体からの重い処理をスレッドプールで実行する）"""
+import asyncio
+import threading
+
+from sqlalchemy.util import greenlet_spawn
+
+import main
+
+def test_offload_runs_in_threadpool_inside_run_sync(monkeypatch):
+    monkeypatch.setattr(main, "DB_ASYNC", True)
+
+    async def run():
+        loop_thread = threading.get_ident()
+        # AsyncSession.run_syncと同じgreenletの中から呼び出す
+        worker_thread = await greenlet_spawn(lambda: main.offload(threading.get_ident))
+        return loop_thread, worker_thread
+
+    loop_thread, worker_thread = asyncio.run(run())
+    assert worker_thread != loop_thread
+
+def test_offload_calls_directly_outside_run_sync(monkeypatch):
+    monkeypatch.setattr(main, "DB_ASYNC", True)
+    assert main.offload(threading.get_ident) == threading.get_ident()
+    assert main.offload(lambda x, y=0: x + y, 1, y=2) == 3
@@ -0,0 +1,40 @@
+# tests/test_pagination.py
+"""管理者向け一覧APIのカーソル"""
+import base64
+import json
+
+import pytest
+
+def make_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+PAGED_ENDPOINTS = ["/api/v1/admin/shift-requests", "/api/v1/admin/confirmed-shifts", "/api/v1/admin/users"]
+
+@pytest.mark.parametrize("url", PAGED_ENDPOINTS)
+@pytest.mark.parametrize("cursor", [
+    "not-base64!",
+    make_cursor({"a": 1}),
+    make_cursor("2031-01-01"),
+    make_cursor([]),
+    make_cursor([1, 2]),
+    make_cursor(["2031-01-01", "x"]),
+    make_cursor(["a", "b", "c"]),
+    make_cursor(None),
+])
+def test_malformed_cursor_is_400(client, admin, url, cursor):
+    r = client.get(url, params={"cursor": cursor}, headers=admin)
+    assert r.status_code == 400, r.text
+
+def test_users_cursor_pages_through(client, admin, make_user):
+    for _ in range(3):
+        make_user()
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        r = client.get("/api/v1/admin/users", params=params, headers=admin)
+        assert r.status_code == 200, r.text
+        seen += [user["id"] for user in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == sorted(set(seen)) and len(seen) >= 4
@@ -0,0 +1,69 @@
+# tests/test_read_your_writes.py
+"""読み取りレプリカへの振り分け（プライマリとレプリカに別々のSQLiteファイルを使う）"""
+import sqlite3
+import time
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import main
+from cache import MemoryBackend
+from replica import ReadYourWrites, RequestUserMiddleware
+
+WINDOW_SECONDS = 0.3
+URL = "/api/v1/shift-requests/?year=2031&month=11"
+
+@pytest.fixture
+def replica(client, monkeypatch, tmp_path):
+    """呼び出した時点のプライマリを複製したレプリカ（以後の書き込みは反映されない）を使う設定にし、
+    (レプリカのエンジン, クライアント) を返す関数"""
+    engines = []
+
+    def start():
+        path = tmp_path / "replica.db"
+        with sqlite3.connect(main.engine.url.database) as source, sqlite3.connect(path) as target:
+            source.backup(target)
+        replica_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        engines.append(replica_engine)
+        monkeypatch.setattr(main, "READ_DATABASE_URL", str(replica_engine.url))
+        monkeypatch.setattr(main, "ReadSessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=replica_engine))
+        monkeypatch.setattr(main, "read_your_writes", ReadYourWrites(MemoryBackend(), WINDOW_SECONDS))
+        # READ_DATABASE_URLを指定して起動した場合と同じくミドルウェアを通す
+        return replica_engine, TestClient(RequestUserMiddleware(main.app))
+
+    yield start
+    for replica_engine in engines:
+        replica_engine.dispose()
+
+def request_dates(client, headers) -> list:
+    r = client.get(URL, headers=headers)
+    assert r.status_code == 200, r.text
+    return [row["date"] for row in r.json()]
+
+def test_read_your_writes(admin, make_user, replica):
+    writer_id, writer = make_user()
+    reader_id, reader = make_user()
+    replica_engine, client = replica()
+
+    # レプリカにだけある行で、書き込んでいないユーザーの読み取り先がレプリカであることを確認する
+    with replica_engine.begin() as conn:
+        conn.execute(main.ShiftRequestModel.__table__.insert().values(
+            date=date(2031, 11, 3), canwork=True, user_id=reader_id
+        ))
+    assert request_dates(client, reader) == ["2031-11-03"]
+
+    r = client.post("/api/v1/shift-requests/", json={"date": "2031-11-04", "canwork": True}, headers=writer)
+    assert r.status_code == 201, r.text
+    # 書き込んだ本人は記録の有効期限内はプライマリから読む（レプリカには反映されていない）
+    assert main.read_your_writes.recently_wrote(writer_id)
+    assert request_dates(client, writer) == ["2031-11-04"]
+    assert not main.read_your_writes.recently_wrote(reader_id)
+    assert request_dates(client, reader) == ["2031-11-03"]
+
+    # 有効期限が過ぎればレプリカに戻る
+    time.sleep(WINDOW_SECONDS + 0.1)
+    assert not main.read_your_writes.recently_wrote(writer_id)
+    assert request_dates(client, writer) == []
@@ -0,0 +1,75 @@
+# tests/test_schedule_solve.py
+"""自動割り当てAPI（既存の確定シフトの扱いと登録）"""
+import main
+
+URL = "/api/v1/admin/schedule/solve"
+
+def setup_month(client, admin, make_user, month: int) -> tuple:
+    """2032年monthの5〜7日に2人がシフト希望を出し、5日は2人とも確定シフトがある状態を作る（テストごとに別の月）"""
+    first_id, first = make_user()
+    second_id, second = make_user()
+    for headers in (first, second):
+        r = client.post("/api/v1/shift-requests/bulk", json=[
+            {"date": f"2032-{month:02d}-0{day}", "canwork": True} for day in (5, 7)
+        ], headers=headers)
+        assert r.status_code == 200, r.text
+    # 6日の0〜5時は、5日22時〜6日1時の確定シフトと重なる
+    for user_id, headers in ((first_id, first), (second_id, second)):
+        r = client.post("/api/v1/shift-requests/", json={
+            "date": f"2032-{month:02d}-06", "canwork": True,
+            "start_time": f"2032-{month:02d}-06T00:00:00", "end_time": f"2032-{month:02d}-06T05:00:00",
+        }, headers=headers)
+        assert r.status_code == 201, r.text
+    r = client.post("/api/v1/admin/confirmed-shifts/bulk", json=[
+        {"date": f"2032-{month:02d}-05", "start_time": "10:00", "end_time": "15:00", "user_id": first_id},
+        {"date": f"2032-{month:02d}-05", "start_time": "22:00", "end_time": "01:00", "user_id": second_id},
+    ], headers=admin)
+    assert r.status_code == 201, r.text
+    return first_id, second_id
+
+def solve(client, admin, month: int, commit: bool):
+    r = client.post(URL, json={"year": 2032, "month": month, "headcount": 0, "commit": commit, "headcount_by_date": {
+        f"2032-{month:02d}-05": 2, f"2032-{month:02d}-06": 1, f"2032-{month:02d}-07": 1,
+    }}, headers=admin)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+def month_shifts(client, admin, month: int) -> list:
+    r = client.get("/api/v1/admin/confirmed-shifts", params={"year": 2032, "month": month}, headers=admin)
+    assert r.status_code == 200, r.text
+    return sorted((row["date"], row["user_id"]) for row in r.json())
+
+def test_solve_skips_existing_and_overlapping(client, admin, make_user):
+    first_id, second_id = setup_month(client, admin, make_user, 1)
+    before = month_shifts(client, admin, 1)
+
+    result = solve(client, admin, 1, commit=False)
+    # 5日は必要人数を満たしている。6日は2人目が前日の確定シフトと重なるため1人目、
+    # 7日は上限を小さくするため2人目（どちらも既存1件 + 1件）
+    assert [(row["date"], row["user_id"]) for row in result["assignments"]] == [
+        ("2032-01-06", first_id), ("2032-01-07", second_id),
+    ]
+    assert result["max_shifts_per_user"] == 2
+    days = [day for day in result["days"] if day["required"]]
+    assert [(day["date"], day["existing"], day["assigned"], day["shortage"]) for day in days] == [
+        ("2032-01-05", 2, 0, 0), ("2032-01-06", 0, 1, 0), ("2032-01-07", 0, 1, 0),
+    ]
+    assert result["committed"] is False
+    assert month_shifts(client, admin, 1) == before
+
+def test_solve_commit_persists_and_invalidates_snapshot(client, admin, make_user):
+    first_id, second_id = setup_month(client, admin, make_user, 2)
+    url = "/api/v1/confirmed-shifts/all?year=2032&month=2"
+    assert len(client.get(url, headers=admin).json()) == 2
+    version, _ = main.month_snapshot_cache.get((2032, 2))
+
+    result = solve(client, admin, 2, commit=True)
+    assert result["committed"] is True
+    assert month_shifts(client, admin, 2) == sorted([
+        ("2032-02-05", first_id), ("2032-02-05", second_id), ("2032-02-06", first_id), ("2032-02-07", second_id),
+    ])
+    assert main.month_snapshot_cache.get((2032, 2))[0] > version
+    assert len(client.get(url, headers=admin).json()) == 4
+
+    # 登録済みのため、もう一度実行しても割り当てはない
+    assert solve(client, admin, 2, commit=False)["assignments"] == []
@@ -0,0 +1,45 @@
+# tests/test_scheduler.py
+"""確定シフトの自動割り当て（最大流と1人あたりの上限の二分探索）"""
+from datetime import date, timedelta
+
+from scheduler import MaxFlow, assign_shifts
+
+DAYS = [date(2032, 1, 5) + timedelta(days=i) for i in range(4)]
+
+def test_max_flow():
+    # 始点0 → 終点5、最大流は23（CLRSの例）
+    flow = MaxFlow(6)
+    for u, v, capacity in [(0, 1, 16), (0, 2, 13), (1, 3, 12), (2, 1, 4), (2, 4, 14), (3, 2, 9), (3, 5, 20), (4, 3, 7), (4, 5, 4)]:
+        flow.add_edge(u, v, capacity)
+    assert flow.max_flow(0, 5) == 23
+
+def test_fills_maximum_slots():
+    # 1(Aのみ)・2(Aのみ)は2人必要でも1人しか入れない。3(A, B)はBにすればすべて埋まる
+    candidates = {DAYS[0]: [1], DAYS[1]: [1], DAYS[2]: [1, 2]}
+    targets = {DAYS[0]: 2, DAYS[1]: 1, DAYS[2]: 1}
+    assignments, max_load = assign_shifts(candidates, targets)
+    assert assignments == {DAYS[0]: [1], DAYS[1]: [1], DAYS[2]: [2]}
+    assert max_load == 2
+
+def test_minimizes_max_load_including_existing_shifts():
+    candidates = {day: [1, 2] for day in DAYS}
+    targets = {day: 1 for day in DAYS}
+    assignments, max_load = assign_shifts(candidates, targets)
+    assert max_load == 2
+    assert sorted(len([day for day in DAYS if user_id in assignments[day]]) for user_id in (1, 2)) == [2, 2]
+
+    # 既存の確定シフトが2件ある人には1日だけ（2+1 と 3 で上限3）
+    assignments, max_load = assign_shifts(candidates, targets, existing_load={1: 2})
+    assert max_load == 3
+    assert sum(len(assignments[day]) for day in DAYS) == 4
+    assert len([day for day in DAYS if 1 in assignments[day]]) == 1
+
+def test_max_load_caps_assignments():
+    candidates = {day: [1] for day in DAYS}
+    targets = {day: 1 for day in DAYS}
+    assignments, max_load = assign_shifts(candidates, targets, existing_load={1: 1}, max_load=3)
+    assert max_load == 3
+    assert sum(len(user_ids) for user_ids in assignments.values()) == 2
+
+def test_no_candidates():
+    assert assign_shifts({}, {DAYS[0]: 1}) == ({}, 0)
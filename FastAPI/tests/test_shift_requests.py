@@ -0,0 +1,19 @@
+# tests/test_shift_requests.py
+"""シフト希望の作成・取得・更新のレスポンス"""
+
+def test_create_get_update_response(client, admin, make_user):
+    user_id, headers = make_user()
+    body = {"date": "2031-05-06", "canwork": True, "description": "授業後から",
+            "start_time": "2031-05-06T13:00:00", "end_time": "2031-05-06T17:00:00"}
+    r = client.post("/api/v1/shift-requests/", json=body, headers=headers)
+    assert r.status_code == 201, r.text
+    created = r.json()
+    assert created == dict(body, id=created["id"], user_id=user_id, user_display_name=created["user_display_name"])
+
+    r = client.get(f"/api/v1/shift-requests/{created['id']}", headers=headers)
+    assert r.status_code == 200 and r.json() == created
+
+    updated = dict(body, date="2031-05-07", canwork=False, description=None, start_time=None, end_time=None)
+    r = client.put(f"/api/v1/shift-requests/{created['id']}", json=updated, headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json() == dict(created, **updated)
@@ -0,0 +1,61 @@
+# tests/test_snapshot_cache.py
+"""月ごとのスナップショット（確定シフト一覧・充足状況）の無効化"""
+import main
+from cache import CacheUnavailableError, MemoryBackend
+
+class FlakyBackend(MemoryBackend):
+    """downの間はキャッシュサーバーに接続できない状態（SocketBackendと同じく書き込みは無視される）"""
+
+    down = False
+
+    def get_many(self, keys):
+        return [None] * len(keys) if self.down else super().get_many(keys)
+
+    def set(self, key, value, ttl_seconds=None):
+        if not self.down:
+            super().set(key, value, ttl_seconds)
+
+    def delete(self, key):
+        if not self.down:
+            super().delete(key)
+
+    def incr(self, key, strict=False):
+        if self.down:
+            if strict:
+                raise CacheUnavailableError("down")
+            return 0
+        return super().incr(key)
+
+def test_write_refused_while_cache_unavailable(client, admin, make_user, monkeypatch):
+    backend = FlakyBackend()
+    monkeypatch.setattr(main.month_snapshot_cache, "backend", backend)
+    monkeypatch.setattr(main.coverage_cache, "backend", backend)
+    user_id, headers = make_user()
+    url = "/api/v1/confirmed-shifts/all?year=2031&month=9"
+    assert client.get(url, headers=headers).json() == []
+
+    backend.down = True
+    shift = {"date": "2031-09-01", "start_time": "10:00", "end_time": "15:00", "user_id": user_id}
+    r = client.post("/api/v1/admin/confirmed-shifts", json=shift, headers=admin)
+    assert r.status_code == 503, r.text
+    r = client.post("/api/v1/shift-requests/", json={"date": "2031-09-01", "canwork": True}, headers=headers)
+    assert r.status_code == 503, r.text
+
+    # 復旧後も、コミットしなかった変更のない一覧と一致する
+    backend.down = False
+    assert client.get(url, headers=headers).json() == []
+    assert client.get("/api/v1/shift-requests/?year=2031&month=9", headers=headers).json() == []
+
+def test_write_invalidates_snapshot(client, admin, make_user, monkeypatch):
+    backend = FlakyBackend()
+    monkeypatch.setattr(main.month_snapshot_cache, "backend", backend)
+    user_id, headers = make_user()
+    url = "/api/v1/confirmed-shifts/all?year=2031&month=10"
+    assert client.get(url, headers=headers).json() == []
+    version, _ = main.month_snapshot_cache.get((2031, 10))
+
+    shift = {"date": "2031-10-01", "start_time": "10:00", "end_time": "15:00", "user_id": user_id}
+    assert client.post("/api/v1/admin/confirmed-shifts", json=shift, headers=admin).status_code == 201
+    # コミットの前後で1回ずつ上がる
+    assert main.month_snapshot_cache.get((2031, 10))[0] == version + 2
+    assert [row["user_id"] for row in client.get(url, headers=headers).json()] == [user_id]
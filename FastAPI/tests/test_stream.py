@@ -0,0 +1,120 @@
+# tests/test_stream.py
+"""SSE（変更通知）の認証・通知条件・キューあふれ時のRESYNC"""
+import asyncio
+from datetime import date
+
+import orjson
+
+import main
+from pubsub import RESYNC, PubSub
+
+def stream_token(client, headers) -> str:
+    r = client.post("/api/v1/changes/stream-token", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["expires_in"] == main.STREAM_TOKEN_SECONDS
+    return r.json()["token"]
+
+def change(entity="shift_request", user_id=1, day="2032-06-10", id=1) -> dict:
+    return {"entity": entity, "operation": "upsert", "id": id, "user_id": user_id, "date": day}
+
+def user(id=1, admin=False) -> main.User:
+    return main.User(id=id, username=f"u{id}", DisplayName=f"u{id}", admin=admin)
+
+def test_stream_token_authenticates_stream(client, make_user):
+    user_id, headers = make_user()
+    assert main.get_stream_user(None, stream_token(client, headers)).id == user_id
+
+def test_login_token_rejected_in_query_string(client, make_user):
+    _, headers = make_user()
+    login_token = headers["Authorization"].split()[1]
+    r = client.get("/api/v1/changes/stream", params={"stream_token": login_token})
+    assert r.status_code == 401
+    r = client.get("/api/v1/changes/stream", params={"access_token": login_token})
+    assert r.status_code == 401
+
+def test_stream_token_rejected_as_bearer(client, make_user):
+    _, headers = make_user()
+    token = stream_token(client, headers)
+    r = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 401
+
+def test_expired_stream_token_rejected(client, make_user, monkeypatch):
+    _, headers = make_user()
+    monkeypatch.setattr(main, "STREAM_TOKEN_SECONDS", -1)
+    r = client.get("/api/v1/changes/stream", params={"stream_token": stream_token(client, headers)})
+    assert r.status_code == 401
+
+def test_filter_by_month():
+    predicate = main.change_filter(user(admin=True), (date(2032, 6, 1), date(2032, 7, 1)), None)
+    assert predicate(change(day="2032-06-01"))
+    assert predicate(change(day="2032-06-30"))
+    assert not predicate(change(day="2032-05-31"))
+    assert not predicate(change(day="2032-07-01"))
+
+def test_filter_by_user_id():
+    predicate = main.change_filter(user(admin=True), None, 2)
+    assert predicate(change(user_id=2))
+    assert predicate(change(entity="confirmed_shift", user_id=2))
+    assert not predicate(change(user_id=3))
+    assert not predicate(change(entity="confirmed_shift", user_id=3))
+
+def test_non_admin_sees_own_requests_and_all_confirmed_shifts():
+    predicate = main.change_filter(user(id=1), None, None)
+    assert predicate(change(user_id=1))
+    assert not predicate(change(user_id=2))
+    assert predicate(change(entity="confirmed_shift", user_id=2))
+
+def test_admin_sees_all_requests():
+    predicate = main.change_filter(user(id=1, admin=True), None, None)
+    assert predicate(change(user_id=2))
+
+def publish(hub: PubSub, *changes):
+    hub.publish(orjson.dumps({"changes": list(changes)}))
+
+def test_pubsub_delivers_matching_changes():
+    async def run():
+        hub = PubSub(max_queue=10)
+        subscription = hub.subscribe(lambda c: c["user_id"] == 1)
+        publish(hub, change(user_id=1, id=1), change(user_id=2, id=2))
+        publish(hub, change(user_id=2, id=3))
+        item = await asyncio.wait_for(subscription.get(), 1)
+        await asyncio.sleep(0)
+        assert subscription.queue.empty()
+        subscription.close()
+        return item, hub.subscriber_count()
+
+    item, count = asyncio.run(run())
+    assert [c["id"] for c in item] == [1]
+    assert count == 0
+
+def test_pubsub_overflow_resyncs():
+    async def run():
+        hub = PubSub(max_queue=2)
+        subscription = hub.subscribe(lambda c: True)
+        for n in range(3):
+            publish(hub, change(id=n))
+        # 配信はcall_soon_threadsafeで予約されるため、イベントループに処理させる
+        await asyncio.sleep(0)
+        items = []
+        while not subscription.queue.empty():
+            items.append(subscription.queue.get_nowait())
+        return items
+
+    # あふれた時点でキューの変更は捨て、再取得させる
+    assert asyncio.run(run()) == [RESYNC]
+
+def test_pubsub_resumes_after_resync():
+    async def run():
+        hub = PubSub(max_queue=1)
+        subscription = hub.subscribe(lambda c: True)
+        publish(hub, change(id=1))
+        publish(hub, change(id=2))
+        await asyncio.sleep(0)
+        first = await subscription.get()
+        publish(hub, change(id=3))
+        second = await asyncio.wait_for(subscription.get(), 1)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is RESYNC
+    assert [c["id"] for c in second] == [3]
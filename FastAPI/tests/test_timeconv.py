@@ -0,0 +1,75 @@
+# tests/test_timeconv.py
+"""timeconv の時刻変換が以前の ZoneInfo を使う実装と同じ結果になること"""
+from datetime import datetime, date, timedelta
+
+import pytest
+
+import timeconv
+from timeconv_reference import (
+    reference_to_jst_time_string,
+    reference_from_time_string_to_utc_datetime,
+    reference_from_utc_to_jst_datetime,
+)
+
+# 日本で夏時間が実施された1948〜1951年は固定オフセットと一致しないため対象外
+DATES = [date(2025, 1, 1), date(2024, 2, 29), date(2025, 7, 1), date(2025, 12, 31), date(1970, 1, 1)]
+TIME_STRINGS = (
+    [f"{h:02d}:{m:02d}" for h in range(24) for m in range(60)]
+    + ["9:00", "9:5", "09:5", "0:0", "１０:３０", "24:00", "23:60", "009:00", "9:000", " 9:00", "9:00 ",
+       "+9:00", "-1:00", "9:", ":30", "10:00:00", "9時", "", "abc", "T10:00",
+       "2025-07-09T18:00:00.000Z", "2025-07-09T00:30:00Z", "2025-07-09T10:00:00+09:00",
+       "2025-07-09T15:45:30", "2025-07-09T15:45:30.123456", "2025-07-09T99:00:00Z"]
+)
+
+def outcome(func, *args):
+    try:
+        return func(*args)
+    except ValueError as e:
+        return ("ValueError", str(e))
+
+@pytest.mark.parametrize("target_date", DATES)
+def test_from_time_string_matches_reference(target_date):
+    mismatches = []
+    for s in TIME_STRINGS:
+        expected = outcome(reference_from_time_string_to_utc_datetime, s, target_date)
+        actual = outcome(timeconv.from_time_string_to_utc_datetime, s, target_date)
+        if expected != actual:
+            mismatches.append((s, expected, actual))
+    assert mismatches == []
+
+# 2日分（日本時間・UTCの日付の境界をどちらも含む）を7分ごと
+UTC_TIMES = [
+    datetime(2025, 7, 1) + timedelta(minutes=minute, seconds=minute % 60, microseconds=minute)
+    for minute in range(0, 24 * 60 * 2, 7)
+]
+
+def test_to_jst_time_string_matches_reference():
+    assert [timeconv.to_jst_time_string(dt) for dt in UTC_TIMES] == [reference_to_jst_time_string(dt) for dt in UTC_TIMES]
+
+@pytest.mark.parametrize("target_date", DATES)
+def test_from_utc_to_jst_datetime_matches_reference(target_date):
+    assert [timeconv.from_utc_to_jst_datetime(dt, target_date) for dt in UTC_TIMES] == [
+        reference_from_utc_to_jst_datetime(dt, target_date) for dt in UTC_TIMES
+    ]
+
+@pytest.mark.parametrize("time_str, target_date, expected", [
+    # 日本時間の0時台はUTCでは前日
+    ("00:00", date(2025, 7, 1), datetime(2025, 6, 30, 15, 0)),
+    ("08:59", date(2025, 1, 1), datetime(2024, 12, 31, 23, 59)),
+    ("09:00", date(2025, 1, 1), datetime(2025, 1, 1, 0, 0)),
+    ("23:59", date(2024, 2, 29), datetime(2024, 2, 29, 14, 59)),
+    # ISO形式はUTCの時刻を日本時間に直した時刻を対象日に組み合わせる（UTC 15:30 は日本時間の翌日 0:30）
+    ("2025-07-09T15:30:00Z", date(2025, 7, 1), datetime(2025, 6, 30, 15, 30)),
+    ("2025-07-09T14:59:00Z", date(2025, 7, 1), datetime(2025, 7, 1, 14, 59)),
+])
+def test_midnight_crossing(time_str, target_date, expected):
+    assert timeconv.from_time_string_to_utc_datetime(time_str, target_date) == expected
+    assert reference_from_time_string_to_utc_datetime(time_str, target_date) == expected
+
+@pytest.mark.parametrize("utc, expected", [
+    (datetime(2025, 7, 1, 14, 59), "23:59"),
+    (datetime(2025, 7, 1, 15, 0), "00:00"),
+    (datetime(2025, 12, 31, 23, 30), "08:30"),
+])
+def test_to_jst_time_string_across_midnight(utc, expected):
+    assert timeconv.to_jst_time_string(utc) == expected == reference_to_jst_time_string(utc)
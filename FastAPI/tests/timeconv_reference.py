@@ -0,0 +1,36 @@
+# tests/timeconv_reference.py
+"""timeconv に移す前の ZoneInfo を使う時刻変換（main.py にあったもの、ログ出力のみ除去）
+
+test_timeconv.py の比較対象と、benchmarks/timeconv_bench.py の計測の比較対象に使います。
+"""
+from datetime import datetime, date
+from zoneinfo import ZoneInfo
+
+def reference_to_jst_time_string(dt: datetime) -> str:
+    jst = ZoneInfo('Asia/Tokyo')
+    jst_dt = dt.replace(tzinfo=ZoneInfo('UTC')).astimezone(jst)
+    return jst_dt.strftime('%H:%M')
+
+def reference_from_time_string_to_utc_datetime(time_str: str, target_date: date) -> datetime:
+    try:
+        if 'T' in time_str and ('Z' in time_str or '+' in time_str or time_str.count(':') >= 2):
+            dt = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
+            jst_dt = dt.replace(tzinfo=ZoneInfo('UTC')).astimezone(ZoneInfo('Asia/Tokyo'))
+            combined_dt = datetime.combine(target_date, jst_dt.time())
+            utc_dt = combined_dt.replace(tzinfo=ZoneInfo('Asia/Tokyo')).astimezone(ZoneInfo('UTC'))
+            return utc_dt.replace(tzinfo=None)
+        elif ':' in time_str and len(time_str.split(':')) == 2:
+            time_obj = datetime.strptime(time_str, '%H:%M').time()
+            jst_dt = datetime.combine(target_date, time_obj).replace(tzinfo=ZoneInfo('Asia/Tokyo'))
+            return jst_dt.astimezone(ZoneInfo('UTC')).replace(tzinfo=None)
+        else:
+            raise ValueError(f"サポートされていない時刻形式: {time_str}")
+    except Exception:
+        raise ValueError(f"時刻の形式が正しくありません: {time_str}. HH:mm形式またはISO形式で入力してください。")
+
+def reference_from_utc_to_jst_datetime(dt: datetime, target_date: date) -> datetime:
+    jst = ZoneInfo('Asia/Tokyo')
+    utc = ZoneInfo('UTC')
+    jst_dt = dt.replace(tzinfo=utc).astimezone(jst)
+    combined_dt = datetime.combine(target_date, jst_dt.time())
+    return combined_dt.replace(tzinfo=jst).astimezone(utc).replace(tzinfo=None)
@@ -0,0 +1,68 @@
+# timeconv.py
+"""シフト時刻の変換（DBはUTCのnaive datetime、画面は日本時間のHH:mm）
+
+日本時間は夏時間がないため（1952年以降）、タイムゾーンDBを引かずに固定オフセット（+9時間）で計算します。
+HH:mmの文字列は種類が少ないため、変換結果をキャッシュします。
+"""
+import functools
+import logging
+from datetime import datetime, date, time, timedelta
+
+logger = logging.getLogger("shift.time")
+
+JST_OFFSET = timedelta(hours=9)
+
+# 1日の分（UTC）→ 日本時間のHH:mm文字列
+_JST_HHMM = [f"{(m + 540) // 60 % 24:02d}:{m % 60:02d}" for m in range(24 * 60)]
+
+def to_jst_time_string(dt: datetime) -> str:
+    """UTC datetimeを日本時間のHH:mm文字列に変換"""
+    return _JST_HHMM[dt.hour * 60 + dt.minute]
+
+def utc_to_jst(dt: datetime) -> datetime:
+    """UTCのnaive datetimeを日本時間のnaive datetimeに変換"""
+    return dt.replace(tzinfo=None) + JST_OFFSET
+
+def jst_to_utc(dt: datetime) -> datetime:
+    """日本時間のnaive datetimeをUTCのnaive datetimeに変換"""
+    return dt - JST_OFFSET
+
+@functools.lru_cache(maxsize=4096)
+def parse_hhmm(time_str: str) -> time:
+    """HH:mm（時・分とも1〜2桁）を解析。strptime('%H:%M')と同じ文字列を受け付ける"""
+    hour, sep, minute = time_str.partition(":")
+    if (
+        sep
+        and 1 <= len(hour) <= 2 and hour.isascii() and hour.isdigit()
+        and 1 <= len(minute) <= 2 and minute.isascii() and minute.isdigit()
+    ):
+        h, m = int(hour), int(minute)
+        if h < 24 and m < 60:
+            return time(h, m)
+    raise ValueError(f"HH:mm形式ではありません: {time_str}")
+
+def from_time_string_to_utc_datetime(time_str: str, target_date: date) -> datetime:
+    """複数形式の時刻文字列（JST）を指定日と組み合わせてUTC datetimeに変換"""
+    try:
+        # 1. ISO形式のdatetime文字列の場合（例: "2025-07-09T18:00:00.000Z"）
+        #    時刻部分をUTCとみなし、日本時間の時刻だけを指定日に組み合わせる
+        if 'T' in time_str and ('Z' in time_str or '+' in time_str or time_str.count(':') >= 2):
+            dt = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
+            jst_time = utc_to_jst(dt).time()
+        # 2. HH:mm形式の文字列の場合（例: "18:00"）
+        elif ':' in time_str and len(time_str.split(':')) == 2:
+            jst_time = parse_hhmm(time_str)
+        # 3. その他の形式は対応不可
+        else:
+            raise ValueError(f"サポートされていない時刻形式: {time_str}")
+    except ValueError as e:
+        logger.debug("時刻変換エラー: %s", e)
+        raise ValueError(f"時刻の形式が正しくありません: {time_str}. HH:mm形式またはISO形式で入力してください。")
+
+    result = jst_to_utc(datetime.combine(target_date, jst_time))
+    logger.debug("時刻変換: time_str=%r, target_date=%s → %s (UTC)", time_str, target_date, result)
+    return result
+
+def from_utc_to_jst_datetime(dt: datetime, target_date: date) -> datetime:
+    """UTCのdatetimeから日本時間の時刻を取得し、指定日と組み合わせてUTCに戻す"""
+    return jst_to_utc(datetime.combine(target_date, utc_to_jst(dt).time()))
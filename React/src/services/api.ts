@@ -8,7 +8,11 @@ import {
   ConfirmedShift,
   ConfirmedShiftCreate,
   MessageResponse,
-  DayOfWeekSettings
+  DayOfWeekSettings,
+  CoverageReport,
+  ChangeFeed,
+  ChangeEvent,
+  StreamToken
 } from '../types';
 
 // API Base URL
@@ -41,6 +45,20 @@ api.interceptors.response.use(
   }
 );
 
+// 管理者向け一覧APIはページ単位で返るため、X-Next-Cursorがなくなるまで続けて取得する
+const fetchAllPages = async <T>(url: string, params: URLSearchParams = new URLSearchParams()): Promise<T[]> => {
+  const results: T[] = [];
+  let cursor: string | undefined;
+  do {
+    const pageParams = new URLSearchParams(params);
+    if (cursor) pageParams.set('cursor', cursor);
+    const response = await api.get<T[]>(`${url}?${pageParams.toString()}`);
+    results.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return results;
+};
+
 // Auth API
 export const authAPI = {
   register: async (userData: UserCreate): Promise<User> => {
@@ -153,17 +171,89 @@ export const confirmedShiftAPI = {
     if (year) params.append('year', year.toString());
     if (month) params.append('month', month.toString());
     
-    const response = await api.get<ConfirmedShift[]>(`/admin/confirmed-shifts?${params}`);
+    return fetchAllPages<ConfirmedShift>('/admin/confirmed-shifts', params);
+  },
+};
+
+// 差分取得API（sinceを省略すると現在のwatermarkだけを返す。sinceの位置の変更履歴が削除済みの場合は410になるため、一覧を取得し直す）
+export const changesAPI = {
+  getChanges: async (since?: number, year?: number, month?: number): Promise<ChangeFeed> => {
+    const params = new URLSearchParams();
+    if (since !== undefined) params.append('since', since.toString());
+    if (year) params.append('year', year.toString());
+    if (month) params.append('month', month.toString());
+
+    const response = await api.get<ChangeFeed>(`/changes?${params}`);
+    return response.data;
+  },
+
+  getStreamToken: async (): Promise<StreamToken> => {
+    const response = await api.post<StreamToken>('/changes/stream-token');
     return response.data;
   },
+
+  // 変更通知を購読（EventSourceはヘッダーを設定できないため、SSE専用の短期トークンをクエリで渡す）。
+  // トークンは接続のたびに発行するので、切断時はEventSourceに任せず新しいトークンで接続し直す。
+  // onResyncは通知を取りこぼした可能性がある場合と再接続時に呼ばれる。戻り値の関数で購読を終了する
+  subscribe: (
+    onChange: (changes: ChangeEvent[]) => void,
+    onResync: () => void,
+    year?: number,
+    month?: number
+  ): (() => void) => {
+    let source: EventSource | null = null;
+    let timer: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
+    let opened = false;
+
+    const reconnect = () => {
+      if (!closed) timer = setTimeout(connect, 3000);
+    };
+
+    const connect = async () => {
+      let token: StreamToken;
+      try {
+        token = await changesAPI.getStreamToken();
+      } catch {
+        reconnect();
+        return;
+      }
+      if (closed) return;
+
+      const params = new URLSearchParams();
+      if (year) params.append('year', year.toString());
+      if (month) params.append('month', month.toString());
+      params.append('stream_token', token.token);
+
+      source = new EventSource(`${API_BASE_URL}/changes/stream?${params}`);
+      source.addEventListener('open', () => {
+        if (opened) onResync();
+        opened = true;
+      });
+      source.addEventListener('change', (event) => {
+        onChange(JSON.parse((event as MessageEvent).data).changes);
+      });
+      source.addEventListener('resync', () => onResync());
+      source.addEventListener('error', () => {
+        source?.close();
+        reconnect();
+      });
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      if (timer) clearTimeout(timer);
+      source?.close();
+    };
+  },
 };
 
 // Admin API
 export const adminAPI = {
   // 既存のAPIはそのまま
   getAllShiftRequests: async (): Promise<ShiftRequest[]> => {
-    const response = await api.get<ShiftRequest[]>('/admin/shift-requests');
-    return response.data;
+    return fetchAllPages<ShiftRequest>('/admin/shift-requests');
   },
 
   // 確定シフト管理API
@@ -184,8 +274,7 @@ export const adminAPI = {
   },
   // ユーザー管理API
   getAllUsers: async (): Promise<User[]> => {
-    const response = await api.get<User[]>('/admin/users');
-    return response.data;
+    return fetchAllPages<User>('/admin/users');
   },
 
   deleteUser: async (id: number): Promise<MessageResponse> => {
@@ -203,6 +292,12 @@ export const adminAPI = {
     const response = await api.put<DayOfWeekSettings>('/admin/settings/dow', settings);
     return response.data;
   },
+
+  // 月の充足状況（サーバー側で集計済み）
+  getCoverage: async (year: number, month: number): Promise<CoverageReport> => {
+    const response = await api.get<CoverageReport>('/admin/analytics/coverage', { params: { year, month } });
+    return response.data;
+  },
 };
 
 export default api;
@@ -68,6 +68,58 @@ export interface DayOfWeekSettings {
   sunday: boolean;
 }
 
+// 差分取得
+export interface ChangeFeed {
+  watermark: number;
+  has_more: boolean;
+  shift_requests: { upserted: ShiftRequest[]; deleted: number[] };
+  confirmed_shifts: { upserted: ConfirmedShift[]; deleted: number[] };
+}
+
+// 変更通知（SSE）の接続用トークン（有効期間が短いため接続のたびに発行する）
+export interface StreamToken {
+  token: string;
+  expires_in: number;
+}
+
+// 変更通知（SSE）のchangeイベント
+export interface ChangeEvent {
+  entity: 'shift_request' | 'confirmed_shift';
+  operation: 'upsert' | 'delete';
+  id: number;
+  user_id: number;
+  date: string;
+}
+
+// 月の充足状況の集計
+export interface CoverageDay {
+  date: string;
+  class_day: boolean;
+  headcount: number;
+  hours: number;
+  available: number;
+  unavailable: number;
+}
+
+export interface CoverageUser {
+  user_id: number;
+  user_display_name: string;
+  shifts: number;
+  hours: number;
+  available_days: number;
+}
+
+export interface CoverageReport {
+  year: number;
+  month: number;
+  class_days: number;
+  uncovered_class_days: string[];
+  total_shifts: number;
+  total_hours: number;
+  days: CoverageDay[];
+  users: CoverageUser[];
+}
+
 // Form Types
 export interface LoginFormData {
   username: string;